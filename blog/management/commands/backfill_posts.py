@@ -0,0 +1,83 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from blog import models
+
+
+class Command(BaseCommand):
+    help = "Fills in the denormalized fields of existing posts."
+
+    def handle(self, *args, **options):
+        posts = dict((post.pk, post) for post in models.Post.objects.all())
+        paths = {}
+
+        def find_ancestors(post):
+            if post.previous_id is None or post.previous_id not in posts:
+                return []
+            if post.pk not in paths:
+                previous = posts[post.previous_id]
+                paths[post.pk] = find_ancestors(previous) + [previous.pk]
+            return paths[post.pk]
+
+        reply_counts = dict.fromkeys(posts, 0)
+        descendant_counts = dict.fromkeys(posts, 0)
+        for post in posts.values():
+            if not post.active:
+                continue
+            if post.previous_id in reply_counts:
+                reply_counts[post.previous_id] += 1
+            for pk in find_ancestors(post):
+                descendant_counts[pk] += 1
+
+        author_ids = set(post.author_id for post in posts.values() if post.author_id)
+        authors = get_user_model().objects.in_bulk(list(author_ids)) if author_ids else {}
+
+        updated = 0
+        for post in posts.values():
+            fields = []
+
+            ancestors = find_ancestors(post)
+            root_id = ancestors[0] if ancestors else None
+            if (
+                post.root_id != root_id or
+                post.depth != len(ancestors) or
+                list(post.ancestors) != ancestors
+            ):
+                post.root_id = root_id
+                post.depth = len(ancestors)
+                post.ancestors = ancestors
+                fields += ['root', 'depth', 'ancestors']
+
+            if post.random_key is None:
+                post.random_key = random.random()
+                fields.append('random_key')
+
+            if (
+                post.reply_count != reply_counts[post.pk] or
+                post.descendant_count != descendant_counts[post.pk]
+            ):
+                post.reply_count = reply_counts[post.pk]
+                post.descendant_count = descendant_counts[post.pk]
+                fields += ['reply_count', 'descendant_count']
+
+            author = authors.get(post.author_id)
+            author_email = author.email if author else ''
+            if post.author_email != author_email:
+                post.author_email = author_email
+                fields.append('author_email')
+
+            if post.excerpt is None or post.html_is_stale():
+                post.render_html()
+                fields += ['excerpt', 'content_html', 'content_html_version']
+
+            if fields:
+                post.save(update_fields=fields)
+                updated += 1
+
+        # Saving queues the summaries of the updated posts, but the others
+        # may predate summaries.
+        models.PostSummary.summarize(list(posts.values()))
+
+        self.stdout.write("Updated {} of {} posts.".format(updated, len(posts)))
@@ -0,0 +1,225 @@
+import io
+import json
+from optparse import make_option
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse, NoReverseMatch
+from django.test import Client
+
+from djangae.test import process_task_queues
+
+from core import benchmarks
+from core import profiling
+
+from blog import models
+from blog import urls
+
+
+# Requests made on top of every named route, as (name, route, query).
+EXTRA_REQUESTS = (
+    ('home:search', 'home', '?q=benchmark'),
+    ('api_collection:expanded', 'api_collection', '?expand=author,replies'),
+    ('api_member:expanded', 'api_member', '?expand=author,replies'),
+    ('api_member:sparse', 'api_member', '?fields=id,title,slug'),
+)
+
+
+class Command(BaseCommand):
+    help = """
+    Seeds an in-memory datastore with threads of posts, requests every
+    named blog route through the test client and reports latency
+    percentiles, datastore RPCs and memory per route. Results can be
+    saved as JSON and compared against a saved baseline, failing the
+    run on regressions.
+    """
+    option_list = BaseCommand.option_list + (
+        make_option('--posts', type='int', default=10,
+                    help="Number of original posts."),
+        make_option('--depth', type='int', default=3,
+                    help="Levels of replies below each original post."),
+        make_option('--fanout', type='int', default=2,
+                    help="Replies to each post on the level above."),
+        make_option('--authors', type='int', default=5,
+                    help="Number of users the posts are spread over."),
+        make_option('--iterations', type='int', default=20,
+                    help="Requests per route, after a first cold one."),
+        make_option('--output', default=None,
+                    help="Write the results to this JSON file."),
+        make_option('--baseline', default=None,
+                    help="Compare against the results in this JSON file."),
+        make_option('--tolerance', type='float', default=0.25,
+                    help="Latency growth over the baseline allowed, as a fraction."),
+    )
+
+    def handle(self, *args, **options):
+        bed = self.activate_stubs()
+        try:
+            seeded = self.seed(options)
+            results = self.run(seeded, options['iterations'])
+        finally:
+            bed.deactivate()
+
+        for name in sorted(results):
+            result = results[name]
+            self.stdout.write(
+                "{0:<28} {1} p50 {2}ms p90 {3}ms p99 {4}ms, {5} RPCs, {6} KB".format(
+                    name,
+                    result['status'],
+                    result['latency'].get('p50_ms'),
+                    result['latency'].get('p90_ms'),
+                    result['latency'].get('p99_ms'),
+                    result['datastore_rpcs'],
+                    result['memory_kb'],
+                )
+            )
+
+        report = {
+            'config': dict(
+                (name, options[name])
+                for name in ('posts', 'depth', 'fanout', 'authors', 'iterations')
+            ),
+            'routes': results,
+        }
+        if options['output']:
+            with io.open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(json.dumps(report, indent=2, sort_keys=True))
+
+        if options['baseline']:
+            with io.open(options['baseline'], encoding='utf-8') as source:
+                baseline = json.loads(source.read())
+            if baseline.get('config') != report['config']:
+                self.stderr.write("Warning: the baseline was seeded differently.")
+            regressions = benchmarks.compare(
+                results, baseline['routes'], options['tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    "Regressions against the baseline:\n" + "\n".join(regressions)
+                )
+            self.stdout.write("No regressions against the baseline.")
+
+    def activate_stubs(self):
+        """Swaps in fresh in-memory service stubs, like djangae's test runner."""
+        from google.appengine.datastore import datastore_stub_util
+        from google.appengine.ext import testbed
+        from djangae.db import caching
+        from djangae.utils import find_project_root
+
+        bed = testbed.Testbed()
+        bed.activate()
+        bed.init_datastore_v3_stub(
+            consistency_policy=datastore_stub_util.PseudoRandomHRConsistencyPolicy(
+                probability=1
+            )
+        )
+        bed.init_memcache_stub()
+        bed.init_user_stub()
+        bed.init_search_stub()
+        bed.init_taskqueue_stub(root_path=find_project_root())
+        caching.clear_context_cache()
+        cache.clear()
+        return bed
+
+    def seed(self, options):
+        """
+        Creates the authors and, for every original post, a reply tree
+        ``depth`` levels deep with ``fanout`` replies per post. Returns
+        the URL kwargs the routes are requested with.
+        """
+        User = get_user_model()
+        authors = [
+            User.objects.create(
+                username="author{0}".format(number),
+                email="author{0}@example.com".format(number),
+            )
+            for number in range(max(1, options['authors']))
+        ]
+
+        def make_post(number, previous=None):
+            post = models.Post(
+                title="Benchmark post {0}".format(number),
+                content="Benchmark content of post {0}.\n\n".format(number) * 20,
+                author=authors[number % len(authors)],
+            )
+            if previous is not None:
+                post.set_previous(previous)
+            return post
+
+        level = [make_post(number) for number in range(max(1, options['posts']))]
+        models.Post.save_many(level)
+        roots = level
+        count = len(level)
+        for _ in range(options['depth']):
+            replies = []
+            for previous in level:
+                for _ in range(options['fanout']):
+                    replies.append(make_post(count, previous))
+                    count += 1
+            models.Post.save_many(replies)
+            level = replies
+        # The side effects of saving are queued unless TASK_RUNNER runs
+        # them synchronously.
+        process_task_queues()
+        self.stdout.write("Seeded {} posts by {} authors.".format(count, len(authors)))
+
+        root = roots[0]
+        return {
+            'slug': root.slug,
+            'reply': root.slug,
+            'author': root.author_email,
+            'pk': root.pk,
+        }
+
+    def run(self, kwargs, iterations):
+        requests = [
+            (pattern.name, pattern.name, '')
+            for pattern in urls.urlpatterns
+            if getattr(pattern, 'name', None)
+        ] + list(EXTRA_REQUESTS)
+
+        client = Client()
+        results = {}
+        for name, route, query in requests:
+            pattern = next(
+                pattern for pattern in urls.urlpatterns
+                if getattr(pattern, 'name', None) == route
+            )
+            try:
+                url = reverse(route, kwargs=dict(
+                    (group, kwargs[group]) for group in pattern.regex.groupindex
+                ))
+            except (KeyError, NoReverseMatch):
+                self.stderr.write("Skipping '{0}': no sample URL.".format(name))
+                continue
+            results[name] = self.measure(client, url + query, iterations)
+        return results
+
+    def measure(self, client, url, iterations):
+        """Requests ``url`` once cold, then ``iterations`` times."""
+        memory_before = benchmarks.memory_kb()
+        cold = self.request(client, url)
+        warm = [self.request(client, url) for _ in range(iterations)]
+        profiles = [profile for _, profile in warm] or [cold[1]]
+        return {
+            'url': url,
+            'status': cold[0],
+            'cold_ms': int(cold[1].wall_time * 1000),
+            'cold_datastore_rpcs': cold[1].datastore_rpcs,
+            'latency': benchmarks.summarize([profile.wall_time for profile in profiles]),
+            'datastore_rpcs': max(profile.datastore_rpcs for profile in profiles),
+            'entities_read': max(profile.entities_read for profile in profiles),
+            'entities_written': max(profile.entities_written for profile in profiles),
+            'cache_hits': max(profile.cache_hits for profile in profiles),
+            'cache_misses': max(profile.cache_misses for profile in profiles),
+            'memory_kb': benchmarks.memory_kb() - memory_before,
+        }
+
+    def request(self, client, url):
+        profiling.start(url)
+        try:
+            response = client.get(url)
+        finally:
+            profile = profiling.finish()
+        return response.status_code, profile
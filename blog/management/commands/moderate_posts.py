@@ -0,0 +1,43 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog import models
+
+
+class Command(BaseCommand):
+    args = "<slug slug ...>"
+    help = "Hides (or reveals) posts in batches, optionally with their replies."
+    option_list = BaseCommand.option_list + (
+        make_option(
+            "--reveal",
+            action="store_true",
+            default=False,
+            help="Reveal the posts instead of hiding them.",
+        ),
+        make_option(
+            "--subtree",
+            action="store_true",
+            default=False,
+            help="Include every reply below the given posts.",
+        ),
+    )
+
+    def handle(self, *slugs, **options):
+        if not slugs:
+            raise CommandError("Give at least one post slug.")
+        posts = []
+        for slug in slugs:
+            try:
+                posts.append(models.Post.objects.get(slug=slug))
+            except models.Post.DoesNotExist:
+                raise CommandError("No post with slug '{}'.".format(slug))
+        if options["subtree"]:
+            posts = models.Post.with_descendants(posts)
+
+        changed = models.Post.set_active_many(posts, options["reveal"])
+        self.stdout.write("{} {} of {} posts.".format(
+            "Revealed" if options["reveal"] else "Hid",
+            len(changed),
+            len(posts)
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog import models
+
+
+class Command(BaseCommand):
+    help = "Indexes every post in the search backend."
+
+    def handle(self, *args, **options):
+        count = 0
+        for post in models.Post.objects.all():
+            post.update_search_index()
+            count += 1
+        self.stdout.write("Indexed {} posts.".format(count))
@@ -0,0 +1,64 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from core.cache import invalidate_tags
+from core.constants import RENDERER_VERSION
+from core.managers import BATCH_SIZE, batch_rewrite
+
+from blog import models
+
+
+class Command(BaseCommand):
+    help = """
+    Re-renders the stored HTML of every post rendered by an older
+    renderer, writing BATCH_SIZE posts at a time.
+    """
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--all',
+            action='store_true',
+            dest='all',
+            default=False,
+            help="Re-render every post, even ones that are up to date."
+        ),
+    )
+
+    def handle(self, *args, **options):
+        self.all = options['all']
+        count = updated = 0
+        batch = []
+        for post in models.Post.objects.only('id', 'content_html_version'):
+            count += 1
+            if self.all or post.html_is_stale():
+                batch.append(post.pk)
+            if len(batch) == BATCH_SIZE:
+                updated += self.rerender(batch)
+                batch = []
+        if batch:
+            updated += self.rerender(batch)
+        self.stdout.write("Re-rendered {} of {} posts.".format(updated, count))
+
+    def render(self, pk, entity):
+        """
+        Renders the content of the entity about to be put back, as the
+        post may have been edited since it was listed.
+        """
+        if not self.all and entity.get('content_html_version') == RENDERER_VERSION:
+            # Saved with the current renderer since it was listed.
+            return None
+        post = models.Post(content=entity.get('content') or u'')
+        post.render_html()
+        return {
+            'excerpt': post.excerpt,
+            'content_html': post.content_html,
+            'content_html_version': post.content_html_version,
+        }
+
+    def rerender(self, pks):
+        written = batch_rewrite(models.Post, pks, self.render)
+        if written:
+            posts = list(models.Post.objects.in_bulk(written).values())
+            models.PostSummary.summarize(posts)
+            invalidate_tags(models.Post.get_bulk_cache_tags(posts))
+        return len(written)
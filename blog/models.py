@@ -1,7 +1,19 @@
+import uuid
+
 from django.db import models
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.utils.safestring import mark_safe
+
+from djangae.fields import ListField
+from djangae.db import transaction
 
 from core.models import Content
+from core.managers import ContentManager
+from core.constants import MAX_SLUG_LENGTH, MAX_TITLE_LENGTH
+from core.cache import invalidate_tags
+from core.rendering import render_text
+from core import tasks
 
 from . import managers
 
@@ -9,8 +21,48 @@ from . import managers
 class Post(Content):
 
     previous = models.ForeignKey("Post", blank=True, null=True)
+    root = models.ForeignKey(
+        "Post",
+        blank=True,
+        null=True,
+        related_name="thread_posts",
+        help_text="""
+        The original post of the thread, denormalized so a whole
+        thread can be fetched with a single query.
+        """
+    )
+    depth = models.PositiveIntegerField(default=0)
+    ancestors = ListField(
+        models.PositiveIntegerField(),
+        blank=True,
+        help_text="""
+        Ids of every post above this one, from the root down to
+        ``previous``.
+        """
+    )
+    reply_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of active direct replies."
+    )
+    descendant_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of active replies anywhere below this post."
+    )
+    counted_changes = ListField(
+        models.CharField(max_length=32),
+        blank=True,
+        editable=False,
+        help_text="""
+        Ids of the latest counter changes applied to this post, so a
+        retried task doesn't apply one twice.
+        """
+    )
     objects = managers.PostManager()
 
+    max_counted_changes = 50
+
     def get_absolute_url(self):
         return reverse("post", kwargs={"slug": self.slug})
 
@@ -20,4 +72,351 @@ class Post(Content):
 
     @property 
     def original(self):
-        return self.previous is None
\ No newline at end of file
+        return self.previous_id is None
+
+    @classmethod
+    def delete_many(cls, posts):
+        """
+        Also deletes every reply below ``posts``, which would otherwise
+        cascade without the side effects of deleting it: the counters
+        above it, its search document and the latest post pointers.
+        """
+        if not posts:
+            return
+        posts = cls.with_descendants(posts)
+        super(Post, cls).delete_many(posts)
+        deleted = set(post.pk for post in posts)
+        deltas = cls.counter_deltas([post for post in posts if post.active], -1)
+        deltas = dict(
+            (pk, delta) for pk, delta in deltas.items() if pk not in deleted
+        )
+        cls.defer_counter_deltas(deltas)
+        LatestPost.posts_deleted(list(deleted))
+        PostSummary.posts_deleted([post.pk for post in posts if post.original])
+
+    @classmethod
+    def with_descendants(cls, posts):
+        """Returns ``posts`` followed by every post below them, without duplicates."""
+        found = dict((post.pk, post) for post in posts)
+        for post in posts:
+            for reply in cls.objects.filter(ancestors=post.pk):
+                found.setdefault(reply.pk, reply)
+        return list(found.values())
+
+    @staticmethod
+    def counter_deltas(posts, step, deltas=None):
+        """
+        Sums the ``(reply, descendant)`` changes of ``posts`` per ancestor,
+        adding to ``deltas`` when given.
+        """
+        if deltas is None:
+            deltas = {}
+        for post in posts:
+            for pk in post.ancestors:
+                replies, descendants = deltas.get(pk, (0, 0))
+                if pk == post.previous_id:
+                    replies += step
+                deltas[pk] = (replies, descendants + step)
+        return deltas
+
+    @classmethod
+    def defer_counter_deltas(cls, deltas):
+        """Applies ``deltas`` in a task, under an id of their own."""
+        if deltas:
+            tasks.defer(
+                tasks.apply_counter_deltas,
+                cls._meta.app_label,
+                cls._meta.model_name,
+                deltas,
+                uuid.uuid4().hex
+            )
+
+    @classmethod
+    def apply_counter_deltas(cls, deltas, change_id):
+        """
+        Applies ``{pk: (reply delta, descendant delta)}`` to the counters.
+
+        Each ancestor is updated in its own transaction, as a deep thread
+        can span more entity groups than one transaction allows, which
+        also records ``change_id`` on it. Ancestors already carrying it
+        are skipped, so the task can be retried after failing halfway.
+        """
+        tags = [cls.list_cache_tag()]
+        originals = []
+        for pk, (replies, descendants) in deltas.items():
+            with transaction.atomic():
+                try:
+                    ancestor = cls.objects.get(pk=pk)
+                except cls.DoesNotExist:
+                    continue
+                if change_id not in ancestor.counted_changes:
+                    counted = list(ancestor.counted_changes) + [change_id]
+                    cls.objects.filter(pk=pk).update(
+                        reply_count=max(0, ancestor.reply_count + replies),
+                        descendant_count=max(0, ancestor.descendant_count + descendants),
+                        counted_changes=counted[-cls.max_counted_changes:]
+                    )
+            tags += [cls.slug_cache_tag(ancestor.slug), cls.pk_cache_tag(pk)]
+            if ancestor.original:
+                originals.append(pk)
+        if originals:
+            PostSummary.summarize(cls.objects.in_bulk(originals).values())
+        # Pages showing the counts may have been cached between the save
+        # invalidating them and the counters catching up.
+        invalidate_tags(tags)
+
+    @classmethod
+    def saved(cls, changes):
+        """
+        Also invalidates the page of the post each saved post replied
+        to, where its author is sent back, and defers the counter deltas
+        of the saved posts. The pages further up are invalidated by the
+        deferred tasks.
+        """
+        super(Post, cls).saved(changes)
+        previous_cache = cls._meta.get_field('previous').get_cache_name()
+        deltas = {}
+        tags = []
+        for change in changes:
+            post = change['obj']
+            if change['adding']:
+                step = 1 if post.active else 0
+            elif change['active_changed']:
+                step = 1 if post.active else -1
+            else:
+                step = 0
+            if step:
+                cls.counter_deltas([post], step, deltas)
+            if post.previous_id:
+                tags.append(cls.pk_cache_tag(post.previous_id))
+                # Replies are attached with set_previous, which leaves
+                # the post they answer cached on them.
+                previous = getattr(post, previous_cache, None)
+                if previous is not None:
+                    tags.append(cls.slug_cache_tag(previous.slug))
+        invalidate_tags(tags)
+        cls.defer_counter_deltas(deltas)
+
+    @classmethod
+    def sync_saved(cls, posts, missing):
+        """Also moves the latest post pointers and rewrites the summaries."""
+        LatestPost.posts_saved(posts)
+        PostSummary.summarize(posts)
+        if missing:
+            LatestPost.posts_deleted(missing)
+            PostSummary.posts_deleted(missing)
+        super(Post, cls).sync_saved(posts, missing)
+
+    @classmethod
+    def get_bulk_cache_tags(cls, posts):
+        tags = super(Post, cls).get_bulk_cache_tags(posts)
+        ancestor_ids = set(pk for post in posts for pk in post.ancestors)
+        if ancestor_ids:
+            ancestors = cls.objects.in_bulk(list(ancestor_ids))
+            tags += [cls.slug_cache_tag(post.slug) for post in ancestors.values()]
+            tags += [cls.pk_cache_tag(pk) for pk in ancestor_ids]
+        return tags
+
+    def set_previous(self, previous):
+        """Attaches the post as a reply to ``previous``."""
+        self.previous = previous
+        self.root_id = previous.root_id or previous.pk
+        self.depth = previous.depth + 1
+        self.ancestors = list(previous.ancestors) + [previous.pk]
+
+    def get_search_filters(self):
+        filters = super(Post, self).get_search_filters()
+        filters['original'] = self.previous_id is None
+        return filters
+
+    def get_ancestors(self):
+        """Returns the posts above this one, root first, in one batched get."""
+        if not self.ancestors:
+            return []
+        found = Post.objects.in_bulk(self.ancestors)
+        return [found[pk] for pk in self.ancestors if pk in found]
+
+
+class PostSummary(models.Model):
+    """
+    The fields list pages show of an original post, in a small entity
+    sharing its id, so listing posts fetches neither their content nor
+    its rendered HTML.
+
+    Rewritten from the post by the tasks that run after it is saved or
+    its counters change, so lists may lag behind a save by a task.
+    """
+    title = models.CharField(max_length=MAX_TITLE_LENGTH)
+    slug = models.CharField(max_length=MAX_SLUG_LENGTH)
+    active = models.BooleanField(default=True)
+    author_email = models.EmailField(blank=True)
+    created = models.DateTimeField()
+    modified = models.DateTimeField()
+    descendant_count = models.PositiveIntegerField(default=0)
+    excerpt = models.TextField(blank=True)
+    objects = ContentManager()
+
+    summarized_fields = (
+        'title', 'slug', 'active', 'author_email', 'created', 'modified',
+        'descendant_count', 'excerpt',
+    )
+
+    def __unicode__(self):
+        return self.title
+
+    def get_absolute_url(self):
+        return reverse("post", kwargs={"slug": self.slug})
+
+    def rendered_excerpt(self):
+        return mark_safe(render_text(self.excerpt))
+
+    @classmethod
+    def summarize(cls, posts):
+        """
+        Writes the summaries of the originals among ``posts`` from the
+        posts as they are, so running it again or late is harmless.
+        """
+        for post in posts:
+            if post.original:
+                summary = cls(pk=post.pk)
+                for name in cls.summarized_fields:
+                    setattr(summary, name, getattr(post, name))
+                summary.save()
+
+    @classmethod
+    def posts_deleted(cls, pks):
+        if pks:
+            cls.objects.filter(pk__in=pks).delete()
+
+
+class LatestPost(models.Model):
+    """
+    Points at the newest post each audience can see, so /latest/ is a
+    cache hit or a single key get instead of an ordered index scan.
+
+    Kept up to date as posts are created, hidden, revealed, renamed and
+    deleted. Only losing the pointed-at post needs a query to find the
+    next newest one.
+    """
+    STAFF = 'staff'
+    ACTIVE = 'active'
+    AUDIENCES = (STAFF, ACTIVE)
+    CACHE_KEY = "latest-post:{0}"
+
+    audience = models.CharField(primary_key=True, max_length=10)
+    # A plain id rather than a ForeignKey, so deleting the post doesn't
+    # cascade to the pointer before it can be moved on.
+    post_id = models.PositiveIntegerField(blank=True, null=True)
+    slug = models.CharField(max_length=MAX_SLUG_LENGTH, blank=True)
+    created = models.DateTimeField(blank=True, null=True)
+
+    @classmethod
+    def get_slug(cls, audience):
+        """Returns the slug of the audience's newest post, or '' when there is none."""
+        key = cls.CACHE_KEY.format(audience)
+        slug = cache.get(key)
+        if slug is None:
+            try:
+                slug = cls.objects.get(pk=audience).slug
+            except cls.DoesNotExist:
+                slug = cls.recompute(audience).slug
+            cache.set(key, slug)
+        return slug
+
+    @classmethod
+    def queryset_for(cls, audience):
+        if audience == cls.STAFF:
+            return Post.objects.all()
+        return Post.objects.are_active()
+
+    @classmethod
+    def recompute(cls, audience, dropped=()):
+        """
+        Points the audience at its newest post found by query, other
+        than the ``dropped`` pks, which were just hidden or deleted and
+        may still show up in the eventually consistent results.
+        """
+        dropped = set(dropped)
+        candidates = cls.queryset_for(audience).order_by('-created')[:len(dropped) + 1]
+        post = next(
+            (post for post in candidates if post.pk not in dropped), None
+        )
+        pointer = cls(audience=audience)
+        pointer.point_at(post)
+        return pointer
+
+    def point_at(self, post):
+        self.post_id = post.pk if post else None
+        self.slug = post.slug if post else ''
+        self.created = post.created if post else None
+        self.save()
+        cache.set(self.CACHE_KEY.format(self.audience), self.slug)
+
+    @classmethod
+    def post_changed(cls, post):
+        for audience in cls.AUDIENCES:
+            visible = audience == cls.STAFF or post.active
+            if not cls.offer(audience, post, visible):
+                # Queries can't run inside a transaction, so finding the
+                # next newest post happens outside of it.
+                cls.recompute(audience, [post.pk])
+
+    @classmethod
+    def posts_saved(cls, posts):
+        """
+        Like ``post_changed`` for a batch of saved posts. Older posts
+        can't become an audience's latest, so only the newest ones and
+        those already pointed at (which may have been hidden or renamed)
+        are offered.
+        """
+        if len(posts) < 2:
+            for post in posts:
+                cls.post_changed(post)
+            return
+        pointed = set(
+            pointer.post_id
+            for pointer in cls.objects.in_bulk(list(cls.AUDIENCES)).values()
+        )
+        offered = set()
+        newest = [
+            max(visible, key=lambda post: post.created)
+            for visible in (posts, [post for post in posts if post.active])
+            if visible
+        ]
+        for post in newest + [post for post in posts if post.pk in pointed]:
+            if post.pk not in offered:
+                offered.add(post.pk)
+                cls.post_changed(post)
+
+    @classmethod
+    def posts_deleted(cls, pks):
+        """Moves every audience pointing at one of the ``pks`` posts on to the next newest."""
+        deleted = set(pks)
+        pointers = cls.objects.in_bulk(list(cls.AUDIENCES))
+        for audience in cls.AUDIENCES:
+            pointer = pointers.get(audience)
+            if pointer is None or pointer.post_id in deleted:
+                cls.recompute(audience, deleted)
+
+    @classmethod
+    def offer(cls, audience, post, visible):
+        """
+        Points the audience at ``post`` if it is now its newest visible
+        post. Returns False when the audience just lost the post it was
+        pointing at.
+        """
+        with transaction.atomic():
+            try:
+                pointer = cls.objects.get(pk=audience)
+            except cls.DoesNotExist:
+                pointer = cls(audience=audience)
+            if pointer.post_id == post.pk:
+                if not visible:
+                    return False
+                if pointer.slug != post.slug:
+                    pointer.point_at(post)
+            elif visible and (
+                pointer.created is None or post.created > pointer.created
+            ):
+                pointer.point_at(post)
+        return True
@@ -1,16 +1,58 @@
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
+
+from core.serializers import DynamicFieldsMixin
+
 from .models import Post
+from . import threads
 
 
-class PostSerializer(serializers.ModelSerializer):
+class AuthorSerializer(serializers.ModelSerializer):
 
     class Meta:
-        model = Post
-        fields = ('id', 'author', 'title', 'slug', 'created', 'modified')
+        model = get_user_model()
+        fields = ('id', 'username', 'email')
 
 
-class PostMemberSerializer(serializers.ModelSerializer):
+class PostSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Expands ``author`` and ``replies``, the whole reply tree below the
+    post. Both are read from the relation caches and ``thread_replies``
+    that ``threads.expand_posts`` fills in with batched queries.
+
+    View counts change without the post being saved, so they are served
+    by ``PostViewCounts`` rather than in these cached representations.
+    """
 
     class Meta:
         model = Post
-        fields = ('id', 'author', 'content', 'title', 'slug', 'created', 'modified')
\ No newline at end of file
+        fields = (
+            'id', 'author', 'author_email', 'title', 'slug', 'created', 'modified',
+            'reply_count', 'descendant_count',
+        )
+
+    def get_expanded_fields(self):
+        return {
+            'author': AuthorSerializer(read_only=True),
+            'replies': serializers.SerializerMethodField(),
+        }
+
+    def get_replies(self, post):
+        if not hasattr(post, 'thread_replies'):
+            threads.load_thread(post)
+        return type(self)(
+            post.thread_replies,
+            many=True,
+            context=self.context,
+            fields=self.requested_fields,
+            expand=self.expand,
+        ).data
+
+
+class PostMemberSerializer(PostSerializer):
+
+    class Meta(PostSerializer.Meta):
+        fields = (
+            'id', 'author', 'author_email', 'content', 'title', 'slug', 'created', 'modified',
+            'reply_count', 'descendant_count',
+        )
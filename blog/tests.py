@@ -1,3 +1,173 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from djangae.test import TestCase
+
+from core.models import CounterShard
+from core.pagination import CursorPaginator, InvalidCursor
+
+from .models import Post
+
+
+class CursorPaginatorTest(TestCase):
+
+    def setUp(self):
+        super(CursorPaginatorTest, self).setUp()
+        posts = [Post.objects.create(title="Post {0}".format(n)) for n in range(7)]
+        # Most of them share a timestamp, so paging has to break ties on pk.
+        Post.objects.filter(pk__in=[post.pk for post in posts[:5]]).update(
+            created=timezone.now()
+        )
+        self.expected = list(
+            Post.objects.order_by('-created', '-pk').values_list('pk', flat=True)
+        )
+        self.paginator = CursorPaginator(Post.objects.all(), 2)
+
+    def test_cursor_round_trip(self):
+        post = Post.objects.get(pk=self.expected[3])
+        for direction in ('n', 'p'):
+            cursor = self.paginator.encode_cursor(direction, post)
+            self.assertEqual(
+                self.paginator.decode_cursor(cursor),
+                (direction, post.created, post.pk)
+            )
+
+    def test_pages_forwards_and_back_through_ties(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(pages[-1].next_cursor))
+        self.assertEqual(
+            [post.pk for page in pages for post in page], self.expected
+        )
+
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(self.paginator.page(back[-1].previous_cursor))
+        self.assertEqual(
+            [post.pk for page in reversed(back) for post in page], self.expected
+        )
+
+    def test_tampered_cursor(self):
+        # Not base64 text, then "x|1|2", "n|abc|1" and "n|1|2|3".
+        for tampered in ("garbage", "eHwxfDI", "bnxhYmN8MQ", "bnwxfDJ8Mw"):
+            self.assertRaises(InvalidCursor, self.paginator.decode_cursor, tampered)
+
+        response = self.client.get(reverse('home'), {'cursor': "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+
+class LatestPostTest(TestCase):
+
+    def setUp(self):
+        super(LatestPostTest, self).setUp()
+        cache.clear()
+        self.older = Post.objects.create(title="Older")
+        self.newer = Post.objects.create(title="Newer")
+
+    def assertLatest(self, post):
+        response = self.client.get(reverse('latest'))
+        self.assertRedirects(
+            response, post.get_absolute_url(), fetch_redirect_response=False
+        )
+
+    def test_hiding_the_latest_post_falls_back_to_the_next_one(self):
+        self.assertLatest(self.newer)
+        self.newer.active = False
+        self.newer.save()
+        self.assertLatest(self.older)
+        self.newer.active = True
+        self.newer.save()
+        self.assertLatest(self.newer)
+
+    def test_deleting_the_latest_post_falls_back_to_the_next_one(self):
+        self.newer.delete()
+        self.assertLatest(self.older)
+
+
+class ReplyCounterTest(TestCase):
+
+    def setUp(self):
+        super(ReplyCounterTest, self).setUp()
+        self.root = Post.objects.create(title="Root")
+        self.reply = self.create_reply(self.root, "Reply")
+        self.nested = self.create_reply(self.reply, "Nested")
+
+    def create_reply(self, previous, title):
+        reply = Post(title=title)
+        reply.set_previous(previous)
+        reply.save()
+        return reply
+
+    def assertCounts(self, post, reply_count, descendant_count):
+        post = Post.objects.get(pk=post.pk)
+        self.assertEqual(
+            (post.reply_count, post.descendant_count),
+            (reply_count, descendant_count)
+        )
+
+    def test_replies_count_on_every_ancestor(self):
+        self.assertCounts(self.root, 1, 2)
+        self.assertCounts(self.reply, 1, 1)
+        self.assertCounts(self.nested, 0, 0)
+
+    def test_hiding_and_revealing(self):
+        self.reply.active = False
+        self.reply.save()
+        self.assertCounts(self.root, 0, 1)
+        self.assertCounts(self.reply, 1, 1)
+
+        self.reply.active = True
+        self.reply.save()
+        self.assertCounts(self.root, 1, 2)
+
+    def test_deleting_a_subtree(self):
+        self.create_reply(self.root, "Other")
+        self.reply.delete()
+        self.assertFalse(Post.objects.filter(pk=self.nested.pk).exists())
+        self.assertCounts(self.root, 1, 1)
+
+    def test_deltas_are_applied_once(self):
+        for attempt in range(2):
+            Post.apply_counter_deltas({self.root.pk: (1, 1)}, "change")
+        self.assertCounts(self.root, 2, 3)
+
+
+class CounterShardTest(TestCase):
+
+    def setUp(self):
+        super(CounterShardTest, self).setUp()
+        cache.clear()
+
+    def flushed_count(self, name):
+        shards = CounterShard.objects.in_bulk(CounterShard.shard_keys(name))
+        return sum(shard.count for shard in shards.values())
+
+    def test_increment_flush_and_get_counts(self):
+        name = "test:views"
+        for n in range(3):
+            CounterShard.increment(name)
+        # Buffered increments count before they are flushed.
+        self.assertEqual(CounterShard.get_counts([name]), {name: 3})
+
+        CounterShard.flush(name)
+        self.assertEqual(cache.get(CounterShard.buffer_key(name)), 0)
+        self.assertEqual(self.flushed_count(name), 3)
+        self.assertEqual(CounterShard.get_counts([name]), {name: 3})
+
+    def test_views_move_with_the_slug(self):
+        post = Post.objects.create(title="Before")
+        old = Post.view_counter_name(post.slug)
+        Post.record_view(post.slug)
+        Post.record_view(post.slug)
+
+        post.title = "After"
+        post.save()
+        new = Post.view_counter_name(post.slug)
+        self.assertNotEqual(old, new)
+        self.assertEqual(CounterShard.get_counts([old, new]), {old: 0, new: 2})
+
+        # Running the merge again finds nothing left to move.
+        CounterShard.merge(old, new)
+        self.assertEqual(self.flushed_count(new), 2)
+        self.assertEqual(CounterShard.get_counts([old, new]), {old: 0, new: 2})
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from . import models
+
+
+def load_thread(post):
+    """
+    Returns the direct replies to ``post`` with the whole reply tree
+    below them built in memory.
+
+    Every reply below ``post`` is fetched with one query on its
+    ``ancestors``, so the recursive include can walk ``thread_replies``
+    and ``previous`` without hitting the datastore again. The flat list
+    is kept on ``post.descendants``, and later calls reuse it.
+    """
+    if not hasattr(post, 'descendants'):
+        post.descendants = list(
+            models.Post.objects.filter(ancestors=post.pk).order_by('created')
+        )
+        build_tree(post, post.descendants)
+    return post.thread_replies
+
+
+def build_tree(post, posts):
+    """
+    Links ``posts`` into a parent -> children tree below ``post``.
+
+    Each node gets a ``thread_replies`` list and has its ``previous``
+    relation cached, so neither needs a query when accessed.
+    """
+    previous_cache = models.Post._meta.get_field('previous').get_cache_name()
+    nodes = {post.pk: post}
+    nodes.update((reply.pk, reply) for reply in posts)
+    children = defaultdict(list)
+    for reply in posts:
+        children[reply.previous_id].append(reply)
+    for node in nodes.values():
+        node.thread_replies = children.get(node.pk, [])
+        parent = nodes.get(node.previous_id)
+        if parent is not None:
+            setattr(node, previous_cache, parent)
+    return post
+
+
+def attach_ancestors(post):
+    """
+    Returns the posts above ``post``, root first, fetched in one batched
+    get, and caches ``previous`` on each of them along the way.
+    """
+    previous_cache = models.Post._meta.get_field('previous').get_cache_name()
+    ancestors = post.get_ancestors()
+    for child, parent in zip(ancestors[1:] + [post], ancestors):
+        if child.previous_id == parent.pk:
+            setattr(child, previous_cache, parent)
+    return ancestors
+
+
+def expand_posts(posts, expand):
+    """
+    Loads what the API's ``expand``ed relations of ``posts`` need: the
+    reply tree below each post, with one query per post, and the authors
+    of every post involved, with one batched get.
+    """
+    nodes = list(posts)
+    if 'replies' in expand:
+        for post in posts:
+            load_thread(post)
+            nodes += post.descendants
+    if 'author' in expand:
+        models.Post.attach_authors(nodes)
+    return posts
@@ -29,6 +29,21 @@ urlpatterns = patterns('',
         view=views.PostCollection.as_view(),
         name="api_collection",
     ),
+    url(
+        regex=r'^api/posts/bulk/$',
+        view=views.PostBulk.as_view(),
+        name="api_bulk",
+    ),
+    url(
+        regex=r'^api/posts/views/$',
+        view=views.PostViewCounts.as_view(),
+        name="api_views",
+    ),
+    url(
+        regex=r'^api/posts/moderate/$',
+        view=views.PostModeration.as_view(),
+        name="api_moderate",
+    ),
     url(
         regex=r'^api/posts/(?P<pk>[0-9]+)/$',
         view=views.PostMember.as_view(),
@@ -1,33 +1,37 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.urlresolvers import reverse_lazy, reverse
-from django.conf import settings 
 from django.contrib.messages.views import SuccessMessageMixin
 from django.http import HttpResponse, Http404
+from django.utils.cache import patch_cache_control
 
 from vanilla import ListView, DetailView, CreateView, UpdateView, RedirectView, TemplateView
 from braces.views import LoginRequiredMixin
-from termsearch.views import TermSearchMixin
-from rest_framework import generics
+from rest_framework import generics, permissions
+from rest_framework.views import APIView
+from rest_framework.response import Response
 
 from core import views as core_views
+from core.models import CounterShard
+from core.pagination import CursorPaginator, InvalidCursor, cursor_url
 
 from . import models
 from . import forms
 from . import serializers
+from . import threads
 
 from google.appengine.api import users
 
 
 class PostListView(
+    core_views.ConditionalGetMixin,
+    core_views.CachedPageMixin,
     core_views.ContextVariableMixin,
-    TermSearchMixin,
+    core_views.CursorPaginationMixin,
+    core_views.SearchMixin,
     ListView
 ):
 
     model = models.Post
-    term_mapping = {
-        "title": "icontains",
-    }
     context_head = "All Posts"
     context_lead = "Some posts will be found below. Eventually."
     
@@ -55,23 +59,71 @@ class PostListView(
     def context_posts(self):
         return self.get_queryset().exists()
 
+    def get_cache_tags(self):
+        return [self.model.list_cache_tag()]
+
+    def get_last_modified(self):
+        # Only known once the page has been fetched, so lists are only
+        # revalidated up front by their ETag.
+        posts = getattr(self, "object_list", None)
+        return max(post.modified for post in posts) if posts else None
+
+    def get_search_filters(self):
+        if self.request.user.is_staff:
+            return {"original": True}
+        return {"original": True, "active": True}
+
     def get_queryset(self):
-        qs = super(PostListView, self).get_queryset()
+        # Lists only show originals, which all have a summary.
+        qs = models.PostSummary.objects.all()
         if self.request.user.is_staff:
-            return qs.originals()
+            return qs
         else:
-            return qs.originals().are_active()
+            return qs.are_active()
 
+    def get_search_queryset(self):
+        return models.PostSummary.objects.all()
 
-class PostDetailView(core_views.ContextVariableMixin, DetailView):
+
+class PostDetailView(
+    core_views.ConditionalGetMixin,
+    core_views.CachedPageMixin,
+    core_views.ContextVariableMixin,
+    DetailView
+):
 
     model = models.Post
     lookup_field = "slug"
     context_include_template = "blog/includes/post_include.html"
 
+    def get(self, request, *args, **kwargs):
+        response = super(PostDetailView, self).get(request, *args, **kwargs)
+        # Cached pages and 304s are views too, and counting costs no
+        # more than the memcache calls of buffering the increment.
+        if response.status_code in (200, 304):
+            self.model.record_view(self.kwargs[self.lookup_field])
+        return response
+
+    def get_cache_tags(self):
+        return [self.model.slug_cache_tag(self.kwargs[self.lookup_field])]
+
+    def get_last_modified(self):
+        """The latest change to the post or any reply in its thread."""
+        if not hasattr(self, "object"):
+            self.object = self.get_object()
+        threads.load_thread(self.object)
+        return max(
+            [self.object.modified] +
+            [reply.modified for reply in self.object.descendants]
+        )
+
     @property 
     def context_replies(self):
-        return self.object.replies.select_related()
+        return threads.load_thread(self.object)
+
+    @property
+    def context_ancestors(self):
+        return threads.attach_ancestors(self.object)
 
     def get_object(self):
         queryset = self.get_queryset()
@@ -95,8 +147,8 @@ class PostRootView(RedirectView):
 
     def get_redirect_url(self, *args, **kwargs):
         post = get_object_or_404(models.Post, slug=self.kwargs['slug'])
-        while post.previous is not None:
-            post = post.previous
+        if post.root_id is not None:
+            post = get_object_or_404(models.Post, pk=post.root_id)
         return post.get_absolute_url()
 
 
@@ -143,14 +195,12 @@ class PostReplyView(PostCreateView):
     
     def form_valid(self, form):
         if form.is_valid():
+            reply_count = self.context_previous.reply_count
             form.instance.title = "re: {title}{count}".format(
                 title=self.context_previous.title,
-                count=" ({})".format(
-                    self.context_previous.replies.count()
-                ) if self.context_previous.replies.exists() else "" 
+                count=" ({})".format(reply_count) if reply_count else ""
             )
-            form.instance.previous = self.context_previous
-            form.save()
+            form.instance.set_previous(self.context_previous)
         return super(PostReplyView, self).form_valid(form)
 
 
@@ -181,10 +231,6 @@ class PostUpdateView(
 
 class AuthoredView(PostListView):
 
-    term_mapping = {
-        "title": "icontains",
-    }
-
     @property 
     def context_head(self):
         return "Posts by {}".format(self.kwargs['author'])
@@ -197,14 +243,14 @@ class AuthoredView(PostListView):
             " matching `{}`".format(q) if q else '' 
         )
 
+    def get_search_filters(self):
+        filters = super(AuthoredView, self).get_search_filters()
+        filters["author"] = self.kwargs['author']
+        return filters
+
     def get_queryset(self):
         qs = super(AuthoredView, self).get_queryset()
-        from django.db.models import get_model
-        author = get_object_or_404(
-            get_model(settings.AUTH_USER_MODEL), 
-            email=self.kwargs['author']
-        )
-        return qs.filter(author=author)
+        return qs.filter(author_email=self.kwargs['author'])
 
 
 class PostHideView(RedirectView):
@@ -214,7 +260,7 @@ class PostHideView(RedirectView):
     def get_redirect_url(self, *args, **kwargs):
         post = get_object_or_404(models.Post, slug=self.kwargs['slug'])
         post.active = False
-        post.save()
+        post.save(update_fields=['active', 'modified'])
         return post.get_absolute_url()
 
 
@@ -225,7 +271,7 @@ class PostRevealView(RedirectView):
     def get_redirect_url(self, *args, **kwargs):
         post = get_object_or_404(models.Post, slug=self.kwargs['slug'])
         post.active = True
-        post.save()
+        post.save(update_fields=['active', 'modified'])
         return post.get_absolute_url()
 
 
@@ -235,15 +281,13 @@ class PostLatestView(RedirectView):
     model = models.Post
 
     def get_redirect_url(self, *args, **kwargs):
-        try:
-            if self.request.user.is_staff:
-                post = self.model.objects.latest()
-            else:
-                post = self.model.objects.are_active().latest()
-        except self.model.DoesNotExist:
+        if self.request.user.is_staff:
+            slug = models.LatestPost.get_slug(models.LatestPost.STAFF)
+        else:
+            slug = models.LatestPost.get_slug(models.LatestPost.ACTIVE)
+        if not slug:
             return reverse('home')
-        else:        
-            return post.get_absolute_url()
+        return reverse('post', kwargs={'slug': slug})
 
 
 class PostRandomView(core_views.RandomObjectMixin, RedirectView):
@@ -265,13 +309,236 @@ class PostRandomView(core_views.RandomObjectMixin, RedirectView):
             return reverse('home')
 
 
-class PostCollection(generics.ListAPIView):
+class PostCollection(
+    core_views.ConditionalGetMixin,
+    core_views.SparseFieldsMixin,
+    generics.ListAPIView
+):
     
-    queryset = models.Post.objects.all()
     serializer_class = serializers.PostSerializer
+    page_size = 20
+    cursor_kwarg = "cursor"
 
-
-class PostMember(generics.RetrieveUpdateDestroyAPIView):
+    def get_queryset(self):
+        # Paging and Last-Modified always need created and modified.
+        fields = set(serializers.PostSerializer.Meta.fields)
+        requested = self.get_requested_fields()
+        if requested is not None:
+            fields &= set(requested)
+        # Expanded relations need their foreign keys even when the
+        # requested fields leave them out.
+        fields |= set(self.get_expand())
+        fields &= set(field.name for field in models.Post._meta.fields)
+        return models.Post.objects.only('id', 'created', 'modified', *fields)
+
+    def list(self, request, *args, **kwargs):
+        paginator = CursorPaginator(self.get_queryset(), self.page_size)
+        try:
+            page = paginator.page(request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        self.object_list = threads.expand_posts(page.object_list, self.get_expand())
+        serializer = self.get_serializer(page.object_list, many=True)
+        return Response({
+            "next": self._absolute_cursor_url(page.next_cursor),
+            "previous": self._absolute_cursor_url(page.previous_cursor),
+            "results": serializer.data,
+        })
+
+    def _absolute_cursor_url(self, cursor):
+        url = cursor_url(self.request, cursor, self.cursor_kwarg)
+        return self.request.build_absolute_uri(url) if url else None
+
+    def get_cache_tags(self):
+        return [models.Post.list_cache_tag()]
+
+    def get_last_modified(self):
+        posts = getattr(self, "object_list", None)
+        return max(post.modified for post in posts) if posts else None
+
+
+class PostMember(
+    core_views.ConditionalGetMixin,
+    core_views.SparseFieldsMixin,
+    generics.RetrieveUpdateDestroyAPIView
+):
     
     queryset = models.Post.objects.all()
-    serializer_class = serializers.PostMemberSerializer
\ No newline at end of file
+    serializer_class = serializers.PostMemberSerializer
+
+    def get_cache_tags(self):
+        return [models.Post.pk_cache_tag(self.kwargs["pk"])]
+
+    def get_object(self):
+        if not hasattr(self, "object"):
+            self.object = super(PostMember, self).get_object()
+        return self.object
+
+    def retrieve(self, request, *args, **kwargs):
+        threads.expand_posts([self.get_object()], self.get_expand())
+        return super(PostMember, self).retrieve(request, *args, **kwargs)
+
+    def get_last_modified(self):
+        """Includes the replies when they were expanded."""
+        post = self.get_object()
+        return max(
+            [post.modified] +
+            [reply.modified for reply in getattr(post, 'descendants', [])]
+        )
+
+
+class PostViewCounts(APIView):
+    """
+    The view counts of the posts named by ``?slugs=``, as ``{slug: count}``.
+
+    Counts change without the posts being saved, so they are left out of
+    cached pages and versioned API responses, which fetch them from here
+    instead. Responses may be cached for a flush interval, as often as
+    the counts change.
+    """
+
+    max_slugs = 100
+
+    def get(self, request, *args, **kwargs):
+        slugs = [slug for slug in request.query_params.get("slugs", "").split(",") if slug]
+        if len(slugs) > self.max_slugs:
+            return Response(
+                {"slugs": ["At most {0} slugs.".format(self.max_slugs)]},
+                status=400
+            )
+        names = dict((slug, models.Post.view_counter_name(slug)) for slug in slugs)
+        counts = CounterShard.get_counts(names.values())
+        response = Response(
+            dict((slug, counts[name]) for slug, name in names.items())
+        )
+        patch_cache_control(
+            response, public=True, max_age=CounterShard.flush_interval
+        )
+        return response
+
+
+class PostModeration(APIView):
+    """
+    Hides or reveals many posts at once, optionally with everything
+    below them, using batched writes.
+
+    Expects ``{"action": "hide" | "reveal", "ids": [...], "subtree": bool}``.
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+    actions = {"hide": False, "reveal": True}
+
+    def post(self, request, *args, **kwargs):
+        action = request.data.get("action")
+        if action not in self.actions:
+            return Response(
+                {"action": ["Must be one of: hide, reveal."]},
+                status=400
+            )
+        if hasattr(request.data, "getlist"):
+            ids = request.data.getlist("ids")
+        else:
+            ids = request.data.get("ids", [])
+        try:
+            if not isinstance(ids, list):
+                raise TypeError(ids)
+            ids = [int(pk) for pk in ids]
+        except (TypeError, ValueError):
+            return Response({"ids": ["Must be a list of post ids."]}, status=400)
+
+        posts = list(models.Post.objects.in_bulk(ids).values()) if ids else []
+        if request.data.get("subtree"):
+            posts = models.Post.with_descendants(posts)
+        changed = models.Post.set_active_many(posts, self.actions[action])
+        return Response({"changed": [post.pk for post in changed]})
+
+
+class PostBulk(APIView):
+    """
+    Creates, updates and deletes many posts in one request.
+
+    Expects ``{"create": [{...}], "update": [{"id": ..., ...}], "delete": [ids]}``
+    and answers with a ``status`` for each item, in the same order, and
+    the post's data or the validation errors. Valid items are written
+    with batched puts and cross-group transactions instead of a request
+    and a put per post.
+    """
+
+    permission_classes = (permissions.IsAdminUser,)
+    serializer_class = serializers.PostMemberSerializer
+    operations = ("create", "update", "delete")
+
+    def post(self, request, *args, **kwargs):
+        errors = dict(
+            (name, ["Must be a list."]) for name in self.operations
+            if not isinstance(request.data.get(name, []), list)
+        )
+        if errors:
+            return Response(errors, status=400)
+        updates = request.data.get("update", [])
+        deletes = request.data.get("delete", [])
+        ids = [self._pk(item.get("id") if isinstance(item, dict) else None) for item in updates]
+        ids += [self._pk(pk) for pk in deletes]
+        ids = [pk for pk in set(ids) if pk is not None]
+        found = models.Post.objects.in_bulk(ids) if ids else {}
+        return Response({
+            "create": self.create(request.data.get("create", [])),
+            "update": self.update(updates, found),
+            "delete": self.delete(deletes, found),
+        })
+
+    def create(self, items):
+        results, posts = [], []
+        for item in items:
+            serializer = self.serializer_class(data=item)
+            if not serializer.is_valid():
+                results.append({"status": 400, "errors": serializer.errors})
+                continue
+            post = models.Post(**serializer.validated_data)
+            if post.author_id is None:
+                post.author = self.request.user
+            results.append(post)
+            posts.append(post)
+        models.Post.save_many(posts)
+        return [self._result(result, 201) for result in results]
+
+    def update(self, items, found):
+        results, posts = [], []
+        for item in items:
+            post = found.get(self._pk(item.get("id") if isinstance(item, dict) else None))
+            if post is None:
+                results.append({"status": 404, "errors": {"id": ["No such post."]}})
+                continue
+            serializer = self.serializer_class(post, data=item, partial=True)
+            if not serializer.is_valid():
+                results.append({"status": 400, "errors": serializer.errors})
+                continue
+            for name, value in serializer.validated_data.items():
+                setattr(post, name, value)
+            results.append(post)
+            posts.append(post)
+        models.Post.save_many(list(dict((post.pk, post) for post in posts).values()))
+        return [self._result(result, 200) for result in results]
+
+    def delete(self, ids, found):
+        results, posts = [], {}
+        for pk in ids:
+            post = found.get(self._pk(pk))
+            if post is None:
+                results.append({"id": pk, "status": 404})
+            else:
+                posts[post.pk] = post
+                results.append({"id": post.pk, "status": 204})
+        models.Post.delete_many(list(posts.values()))
+        return results
+
+    def _result(self, result, status):
+        if isinstance(result, models.Post):
+            return {"status": status, "data": self.serializer_class(result).data}
+        return result
+
+    def _pk(self, value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
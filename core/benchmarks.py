@@ -0,0 +1,65 @@
+import os
+import resource
+
+
+def percentile(values, fraction):
+    """Returns the ``fraction`` percentile of ``values``, interpolating between ranks."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(durations):
+    """Summarizes durations in seconds as milliseconds."""
+    if not durations:
+        return {"count": 0}
+    return {
+        "count": len(durations),
+        "mean_ms": round(1000.0 * sum(durations) / len(durations), 3),
+        "p50_ms": round(1000.0 * percentile(durations, 0.5), 3),
+        "p90_ms": round(1000.0 * percentile(durations, 0.9), 3),
+        "p99_ms": round(1000.0 * percentile(durations, 0.99), 3),
+        "max_ms": round(1000.0 * max(durations), 3),
+    }
+
+
+def memory_kb():
+    """Returns the resident memory of the process, or its peak where that's all there is."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (IOError, OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a message for every result that regressed against
+    ``baseline``, both ``{name: stats}``.
+
+    Latency may grow by ``tolerance`` (a fraction) to allow for noise.
+    RPC counts are deterministic, so any increase is a regression.
+    """
+    regressions = []
+    for name in sorted(results):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        after = results[name]
+        old, new = before["latency"].get("p90_ms"), after["latency"].get("p90_ms")
+        if old is not None and new is not None and new > old * (1 + tolerance):
+            regressions.append(
+                "{0}: p90 latency {1}ms, baseline {2}ms".format(name, new, old)
+            )
+        if after["datastore_rpcs"] > before["datastore_rpcs"]:
+            regressions.append(
+                "{0}: {1} datastore RPCs per request, baseline {2}".format(
+                    name, after["datastore_rpcs"], before["datastore_rpcs"]
+                )
+            )
+    return regressions
@@ -0,0 +1,45 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+GENERATION_KEY = "generation:{0}"
+
+
+def _new_generation():
+    # Starting from the clock keeps a tag that was evicted from the cache
+    # from coming back with a generation it has already been through.
+    return int(time.time() * 1000)
+
+
+def get_generations(tags):
+    """Returns the current generation of every tag, creating missing ones."""
+    keys = dict((GENERATION_KEY.format(tag), tag) for tag in tags)
+    found = cache.get_many(keys.keys())
+    generations = {}
+    for key, tag in keys.items():
+        if key not in found:
+            found[key] = _new_generation()
+            cache.add(key, found[key], None)
+        generations[tag] = found[key]
+    return generations
+
+
+def invalidate_tags(tags):
+    """Moves every tag to a new generation, orphaning keys built on it."""
+    for tag in set(tags):
+        key = GENERATION_KEY.format(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), None)
+
+
+def tagged_key(prefix, tags, *parts):
+    """Builds a cache key that changes whenever any of ``tags`` is invalidated."""
+    generations = get_generations(tags)
+    raw = u"|".join(
+        [u"{0}={1}".format(tag, generations[tag]) for tag in sorted(generations)] +
+        [u"{0}".format(part) for part in parts]
+    )
+    return "{0}:{1}".format(prefix, hashlib.md5(raw.encode('utf-8')).hexdigest())
@@ -1,3 +1,6 @@
 REMOVE_LIST = ["a", "an", "as", "at", "before", "but", "by", "for","from","is", "in", "into", "like", "of", "off", "on", "onto","per","since", "than", "the", "this", "that", "to", "up", "via","with"]
 MAX_TITLE_LENGTH = 255
 MAX_SLUG_LENGTH = 25
+EXCERPT_WORDS = 50
+# Bump whenever the output of core.rendering changes, so stored HTML is re-rendered.
+RENDERER_VERSION = 1
@@ -0,0 +1,78 @@
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.template.base import TemplateDoesNotExist
+from django.template.loader import BaseLoader
+from django.utils.importlib import import_module
+
+
+def find_templates():
+    """Returns ``{name: source}`` for every template in TEMPLATE_DIRS, the first directory winning."""
+    templates = {}
+    for template_dir in settings.TEMPLATE_DIRS:
+        for root, _, filenames in os.walk(template_dir):
+            for filename in filenames:
+                if not filename.endswith('.html'):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, template_dir).replace(os.sep, '/')
+                if name in templates:
+                    continue
+                with io.open(path, encoding=settings.FILE_CHARSET) as source:
+                    templates[name] = source.read()
+    return templates
+
+
+def templates_hash(templates):
+    """Returns a digest of the names and sources of ``templates``."""
+    digest = hashlib.md5()
+    for name in sorted(templates):
+        digest.update(name.encode('utf-8') + b'\0')
+        digest.update(templates[name].encode('utf-8') + b'\0')
+    return digest.hexdigest()
+
+
+def bundle_is_current():
+    """Whether the TEMPLATE_BUNDLE module was built from the templates on disk."""
+    try:
+        bundle = import_module(settings.TEMPLATE_BUNDLE)
+    except (AttributeError, ImportError):
+        return False
+    return getattr(bundle, 'SOURCE_HASH', None) == templates_hash(find_templates())
+
+
+class BundleLoader(BaseLoader):
+    """
+    Serves template sources from the module named by TEMPLATE_BUNDLE, as
+    written by the ``bundle_templates`` command.
+
+    The bundle is imported once per instance, so lookups never touch the
+    filesystem. Templates missing from it fall through to the next loader.
+    Whether it is current is checked when deploying, with
+    ``bundle_templates --check``, rather than here.
+    """
+
+    is_usable = True
+
+    def __init__(self, *args, **kwargs):
+        super(BundleLoader, self).__init__(*args, **kwargs)
+        self._templates = None
+
+    def get_templates(self):
+        if self._templates is None:
+            try:
+                bundle = import_module(settings.TEMPLATE_BUNDLE)
+            except (AttributeError, ImportError):
+                self._templates = {}
+            else:
+                self._templates = bundle.TEMPLATES
+        return self._templates
+
+    def load_template_source(self, template_name, template_dirs=None):
+        try:
+            source = self.get_templates()[template_name]
+        except KeyError:
+            raise TemplateDoesNotExist(template_name)
+        return source, "bundle:{0}".format(template_name)
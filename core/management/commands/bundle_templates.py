@@ -0,0 +1,50 @@
+import io
+import os
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.base import Template
+from django.utils.importlib import import_module
+
+from core.loaders import bundle_is_current, find_templates, templates_hash
+
+
+class Command(BaseCommand):
+    help = "Writes every template in TEMPLATE_DIRS into the TEMPLATE_BUNDLE module."
+    option_list = BaseCommand.option_list + (
+        make_option('--check', action='store_true', default=False,
+                    help="Only fail when the bundle doesn't match the templates."),
+    )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            if not bundle_is_current():
+                raise CommandError(
+                    "{0} is out of date: run bundle_templates.".format(settings.TEMPLATE_BUNDLE)
+                )
+            self.stdout.write("{0} is up to date.".format(settings.TEMPLATE_BUNDLE))
+            return
+
+        templates = find_templates()
+        for name, source in templates.items():
+            # Fail the build rather than the first request.
+            Template(source, name=name)
+
+        package, _, module = settings.TEMPLATE_BUNDLE.rpartition('.')
+        target = os.path.join(
+            os.path.dirname(import_module(package).__file__),
+            module + '.py'
+        )
+        with io.open(target, 'w', encoding='utf-8') as bundle:
+            bundle.write(u"# -*- coding: utf-8 -*-\n")
+            bundle.write(u"# Generated by `manage.py bundle_templates`, do not edit.\n\n")
+            bundle.write(u"SOURCE_HASH = {0!r}\n\n".format(templates_hash(templates)))
+            bundle.write(u"TEMPLATES = {\n")
+            for name in sorted(templates):
+                bundle.write(u"    {0!r}: {1!r},\n".format(
+                    name, templates[name]
+                ))
+            bundle.write(u"}\n")
+
+        self.stdout.write("Bundled {} templates into {}.".format(len(templates), target))
@@ -0,0 +1,161 @@
+import io
+import json
+import threading
+import time
+from collections import defaultdict
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import resolve, Resolver404
+from django.test import Client
+from django.utils.six.moves import queue
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    args = "[log.jsonl]"
+    help = """
+    Replays a JSONL traffic log against the app in-process and reports
+    throughput, tail latency and error rates per URL pattern.
+
+    Every line is a JSON object with a ``path`` (which may carry a query
+    string) and optionally a ``method``, a ``timestamp`` in seconds, a
+    ``body`` and its ``content_type``. Lines without a path, or with a
+    method the test client can't send, are skipped.
+    """
+    option_list = BaseCommand.option_list + (
+        make_option('--threads', type='int', default=4,
+                    help="Number of concurrent clients."),
+        make_option('--recorded-timing', action='store_true', default=False,
+                    dest='recorded_timing',
+                    help="Send requests at their recorded offsets instead of as fast as possible."),
+        make_option('--speedup', type='float', default=1.0,
+                    help="Divides the recorded offsets, with --recorded-timing."),
+        make_option('--limit', type='int', default=None,
+                    help="Replay at most this many requests."),
+        make_option('--output', default=None,
+                    help="Write the results to this JSON file."),
+    )
+
+    methods = ('get', 'head', 'options', 'post', 'put', 'patch', 'delete')
+
+    def handle(self, path='requests.jsonl', **options):
+        entries = self.load(path, options['limit'])
+        if not entries:
+            raise CommandError("No requests with a path in {0}.".format(path))
+
+        first = min(entry.get('timestamp', 0) for entry in entries)
+        pending = queue.Queue()
+        for entry in entries:
+            pending.put(entry)
+        outcomes = []
+        lock = threading.Lock()
+        started = time.time()
+
+        def work():
+            client = Client()
+            while True:
+                try:
+                    entry = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if options['recorded_timing']:
+                    due = started + (entry.get('timestamp', first) - first) / options['speedup']
+                    time.sleep(max(0, due - time.time()))
+                outcome = self.send(client, entry)
+                with lock:
+                    outcomes.append(outcome)
+
+        workers = [
+            threading.Thread(target=work) for _ in range(max(1, options['threads']))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.time() - started
+
+        results = self.summarize(outcomes, elapsed)
+        for name in sorted(results):
+            result = results[name]
+            self.stdout.write(
+                "{0:<24} {1:>6} reqs {2:>8.1f}/s p50 {3}ms p99 {4}ms errors {5:.1%}".format(
+                    name,
+                    result['count'],
+                    result['throughput'],
+                    result['latency'].get('p50_ms'),
+                    result['latency'].get('p99_ms'),
+                    result['error_rate'],
+                )
+            )
+        self.stdout.write("Replayed {0} requests in {1:.2f}s with {2} threads.".format(
+            len(outcomes), elapsed, len(workers)
+        ))
+
+        if options['output']:
+            with io.open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(json.dumps(results, indent=2, sort_keys=True))
+
+    def load(self, path, limit):
+        entries = []
+        with io.open(path, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(entry, dict) or not entry.get('path'):
+                    continue
+                if entry.get('method', 'GET').lower() not in self.methods:
+                    continue
+                entries.append(entry)
+                if limit is not None and len(entries) >= limit:
+                    break
+        entries.sort(key=lambda entry: entry.get('timestamp', 0))
+        return entries
+
+    def send(self, client, entry):
+        """Returns ``(pattern name, status, seconds)``; exceptions count as 500s."""
+        path = entry['path']
+        try:
+            name = resolve(path.split('?', 1)[0]).view_name
+        except Resolver404:
+            name = "<unresolved>"
+        method = entry.get('method', 'GET').lower()
+        send = getattr(client, method)
+        started = time.time()
+        try:
+            if 'body' in entry and method != 'get':
+                body = entry['body']
+                if not isinstance(body, (bytes, type(u''))):
+                    body = json.dumps(body)
+                response = send(
+                    path,
+                    data=body,
+                    content_type=entry.get('content_type', 'application/json')
+                )
+            else:
+                response = send(path)
+            status = response.status_code
+        except Exception:
+            status = 500
+        return name, status, time.time() - started
+
+    def summarize(self, outcomes, elapsed):
+        by_pattern = defaultdict(list)
+        for name, status, duration in outcomes:
+            by_pattern[name].append((status, duration))
+        results = {}
+        for name, requests in by_pattern.items():
+            errors = sum(1 for status, _ in requests if status >= 500)
+            results[name] = {
+                'count': len(requests),
+                'throughput': len(requests) / elapsed if elapsed else 0.0,
+                'error_rate': float(errors) / len(requests),
+                'client_error_rate': float(
+                    sum(1 for status, _ in requests if 400 <= status < 500)
+                ) / len(requests),
+                'latency': benchmarks.summarize([duration for _, duration in requests]),
+            }
+        return results
@@ -1,5 +1,69 @@
+import datetime
+
 from django.db import models
 
+BATCH_SIZE = 500
+# Entity groups a cross-group transaction may touch.
+XG_BATCH_SIZE = 25
+# IN and != filters are run as one datastore query per value, up to this many.
+MAX_SUBQUERIES = 30
+
+
+def batch_update(model, pks, **values):
+    """
+    Writes ``values`` (keyed by column name) onto the rows ``pks`` with
+    one datastore Get and one Put per BATCH_SIZE rows.
+
+    Unlike ``QuerySet.update``, which runs a transaction per entity, this
+    doesn't touch unique constraint markers, so it must not be used for
+    unique fields.
+    """
+    batch_update_each(model, dict((pk, values) for pk in pks))
+
+
+def batch_update_each(model, updates):
+    """Like ``batch_update``, with different ``{pk: values}`` for each row."""
+    batch_rewrite(model, list(updates), lambda pk, entity: updates[pk])
+
+
+def batch_rewrite(model, pks, rewrite):
+    """
+    Like ``batch_update_each``, with the values of each row returned by
+    ``rewrite(pk, entity)`` from the entity fetched by the same Get as
+    it is put back, so values derived from a row are never computed
+    from an older copy of it. Rows ``rewrite`` returns None for are
+    left alone. Returns the pks of the rows written.
+    """
+    from google.appengine.api import datastore
+    from djangae.db import caching
+    from djangae.db.utils import get_datastore_key, make_timezone_naive
+
+    def prepare(values):
+        return dict(
+            (name, make_timezone_naive(value) if isinstance(value, datetime.datetime) else value)
+            for name, value in values.items()
+        )
+
+    keys = dict((get_datastore_key(model, pk), pk) for pk in pks)
+    ordered = list(keys)
+    written = []
+    for start in range(0, len(ordered), BATCH_SIZE):
+        batch = ordered[start:start + BATCH_SIZE]
+        entities = []
+        for entity in datastore.Get(batch):
+            if entity is None:
+                continue
+            values = rewrite(keys[entity.key()], entity)
+            if values is not None:
+                entity.update(prepare(values))
+                entities.append(entity)
+        if entities:
+            datastore.Put(entities)
+        for entity in entities:
+            caching.remove_entity_from_cache_by_key(entity.key())
+            written.append(keys[entity.key()])
+    return written
+
 
 class ContentQuerySet(models.query.QuerySet):
 
@@ -13,4 +77,4 @@ class ContentManager(models.Manager):
         return ContentQuerySet(self.model, using=self._db)
 
     def are_active(self):
-        return self.get_queryset().are_active()
\ No newline at end of file
+        return self.get_queryset().are_active()
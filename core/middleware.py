@@ -0,0 +1,67 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import profiling
+
+
+class ProfilingMiddleware(object):
+    """
+    Records what each request costs, per view name, when
+    PROFILING_ENABLED is set.
+
+    With PROFILING_HEADERS (the default under DEBUG) every response
+    carries the numbers as ``X-Profile-*`` headers. Otherwise a
+    PROFILING_SAMPLE_RATE fraction of requests is logged as one JSON
+    line each. Cache hits and misses count memcache gets, so they stay
+    at zero with a local memory cache.
+    """
+
+    header_prefix = "X-Profile-"
+
+    def __init__(self):
+        self.enabled = getattr(settings, "PROFILING_ENABLED", False)
+        self.headers = getattr(settings, "PROFILING_HEADERS", settings.DEBUG)
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.01)
+
+    def process_request(self, request):
+        if self.enabled and (self.headers or random.random() < self.sample_rate):
+            request._profile = profiling.start()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = getattr(request, "_profile", None)
+        if profile is not None:
+            match = request.resolver_match
+            profile.name = match.view_name if match else view_func.__name__
+
+    def process_template_response(self, request, response):
+        profile = getattr(request, "_profile", None)
+        if profile is not None:
+            started = time.time()
+
+            def rendered(response):
+                profile.render_time += time.time() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def process_response(self, request, response):
+        if getattr(request, "_profile", None) is None:
+            return response
+        profile = profiling.finish()
+        stats = profile.as_dict()
+        if self.headers:
+            for name, value in sorted(stats.items()):
+                header = self.header_prefix + name.replace("_", "-").title()
+                response[header] = u"{0}".format(value)
+        else:
+            stats.update(
+                path=request.path,
+                method=request.method,
+                status=response.status_code,
+            )
+            logging.info("profile %s", json.dumps(stats, sort_keys=True))
+        return response
@@ -1,8 +1,20 @@
-from django.db import models
+import random
+
+from django.db import models, IntegrityError
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.text import Truncator
+from django.utils.safestring import mark_safe
+
+from djangae.db import transaction
 
 from .shortcuts import short_slugify, not_implemented
-from .managers import ContentManager
+from .cache import invalidate_tags
+from . import search
+from . import tasks
+from .managers import ContentManager, batch_update, MAX_SUBQUERIES, XG_BATCH_SIZE
+from .rendering import render_text
 from .constants import *
 
 
@@ -18,6 +30,199 @@ class TimeStampedModel(models.Model):
         abstract = True
 
 
+class SlugReservation(models.Model):
+    """
+    Counts how many slugs have been handed out for a base slug, so a
+    unique one can be picked with a single transactional get instead of
+    probing for free suffixes with queries.
+    """
+    key = models.CharField(primary_key=True, max_length=500)
+    count = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def reserve(cls, namespace, base, count=1):
+        """Returns ``count`` slugs built on ``base`` that nobody else was given."""
+        key = u"{0}:{1}".format(namespace, base)
+        with transaction.atomic():
+            try:
+                reservation = cls.objects.get(pk=key)
+            except cls.DoesNotExist:
+                reservation = cls(key=key)
+            start = reservation.count
+            reservation.count += count
+            reservation.save()
+        return [
+            cls.suffixed(base, number) for number in range(start, start + count)
+        ]
+
+    @staticmethod
+    def suffixed(base, number):
+        if not number:
+            return base
+        suffix = "-{0}".format(number + 1)
+        return base[:MAX_SLUG_LENGTH - len(suffix)].rstrip('-') + suffix
+
+    @classmethod
+    def is_suffixed(cls, slug, base):
+        """Whether ``slug`` is ``base`` or one of the slugs ``suffixed`` builds on it."""
+        if slug == base:
+            return True
+        rest, _, number = slug.rpartition('-')
+        return bool(rest) and number.isdigit() and int(number) > 1 and (
+            cls.suffixed(base, int(number) - 1) == slug
+        )
+
+
+class CounterShard(models.Model):
+    """
+    One of ``shard_count`` partial counts of a named counter.
+
+    Increments only touch memcache: they add up in a buffer that a
+    deferred task moves into a random shard every ``flush_interval``
+    seconds, so a hot counter costs neither a put per increment nor a
+    single contended entity. Totals are summed with one batched get of
+    the shards' known keys and cached until the next flush.
+    """
+    key = models.CharField(primary_key=True, max_length=500)
+    count = models.PositiveIntegerField(default=0)
+
+    # ``merge`` writes every shard of a counter and one more in a single
+    # cross-group transaction, which is limited to 25 entity groups.
+    shard_count = 20
+    flush_interval = 60
+    total_timeout = 60
+
+    @classmethod
+    def shard_keys(cls, name):
+        return [u"{0}:{1}".format(name, number) for number in range(cls.shard_count)]
+
+    @staticmethod
+    def buffer_key(name):
+        return u"counter:buffer:{0}".format(name)
+
+    @staticmethod
+    def total_key(name):
+        return u"counter:total:{0}".format(name)
+
+    @staticmethod
+    def scheduled_key(name):
+        return u"counter:scheduled:{0}".format(name)
+
+    @classmethod
+    def increment(cls, name, step=1):
+        """
+        Adds ``step`` to the buffer of ``name`` and schedules a flush,
+        unless one is already due. Buffered counts evicted from memcache
+        before they are flushed are lost.
+        """
+        key = cls.buffer_key(name)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key, step)
+        except ValueError:
+            # Evicted between the add and the incr.
+            cache.set(key, step, None)
+        if cache.add(cls.scheduled_key(name), True, cls.flush_interval):
+            tasks.defer(tasks.flush_counter, name, _countdown=cls.flush_interval)
+
+    @classmethod
+    def flush(cls, name):
+        """
+        Moves the buffered count of ``name`` into a random shard.
+
+        The buffer is decremented by what was read rather than reset, so
+        increments racing with the flush wait for the next one, and it is
+        topped up again when the write fails, so retrying the task
+        doesn't lose or double them.
+        """
+        key = cls.buffer_key(name)
+        value = cache.get(key)
+        if not value:
+            return
+        try:
+            cache.decr(key, value)
+        except ValueError:
+            pass
+        try:
+            cls.add_to_shard(name, value)
+        except Exception:
+            if not cache.add(key, value, None):
+                cache.incr(key, value)
+            raise
+        cache.delete(cls.total_key(name))
+
+    @classmethod
+    def add_to_shard(cls, name, value):
+        key = random.choice(cls.shard_keys(name))
+        with transaction.atomic():
+            try:
+                shard = cls.objects.get(pk=key)
+            except cls.DoesNotExist:
+                shard = cls(key=key)
+            shard.count += value
+            shard.save()
+
+    @classmethod
+    def merge(cls, source, target):
+        """
+        Adds the count of ``source`` to ``target`` and removes its
+        shards, e.g. when what it counted was renamed. Running it again
+        finds nothing left to move.
+        """
+        cls.flush(source)
+        with transaction.atomic(xg=True):
+            shards = cls.objects.in_bulk(cls.shard_keys(source))
+            if not shards:
+                return
+            key = random.choice(cls.shard_keys(target))
+            try:
+                shard = cls.objects.get(pk=key)
+            except cls.DoesNotExist:
+                shard = cls(key=key)
+            shard.count += sum(found.count for found in shards.values())
+            shard.save()
+            cls.objects.filter(pk__in=list(shards)).delete()
+        cache.delete_many([cls.total_key(source), cls.total_key(target)])
+
+    @classmethod
+    def get_counts(cls, names):
+        """
+        Returns the count of each of ``names``: the flushed total plus
+        what is still buffered, read with one memcache call. Totals that
+        aren't cached are summed from one batched get of their shards.
+        """
+        names = set(names)
+        if not names:
+            return {}
+        keys = dict((cls.total_key(name), name) for name in names)
+        cached = cache.get_many(
+            list(keys) + [cls.buffer_key(name) for name in names]
+        )
+        totals = dict(
+            (keys[key], value) for key, value in cached.items() if key in keys
+        )
+        missing = names - set(totals)
+        if missing:
+            shards = cls.objects.in_bulk(
+                [key for name in missing for key in cls.shard_keys(name)]
+            )
+            summed = dict(
+                (name, sum(
+                    shards[key].count for key in cls.shard_keys(name) if key in shards
+                ))
+                for name in missing
+            )
+            cache.set_many(
+                dict((cls.total_key(name), total) for name, total in summed.items()),
+                cls.total_timeout
+            )
+            totals.update(summed)
+        return dict(
+            (name, totals[name] + (cached.get(cls.buffer_key(name)) or 0))
+            for name in names
+        )
+
+
 class Content(TimeStampedModel):
     """
     An abstract base class model for all content that may
@@ -30,6 +235,14 @@ class Content(TimeStampedModel):
         null=True,
         related_name='authored_%(class)ss'
     )
+    author_email = models.EmailField(
+        blank=True,
+        editable=False,
+        help_text="""
+        Copy of the author's email, so pages can show and filter by
+        author without fetching the user.
+        """
+    )
     slug = models.CharField(
         max_length=MAX_SLUG_LENGTH,
         unique=True,
@@ -45,14 +258,344 @@ class Content(TimeStampedModel):
         default=True
     )
     content = models.TextField(blank=True)
+    excerpt = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="The first words of ``content``, for list pages."
+    )
+    content_html = models.TextField(
+        blank=True,
+        editable=False,
+        help_text="``content`` rendered to HTML when it was saved."
+    )
+    content_html_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="""
+        The RENDERER_VERSION ``content_html`` was rendered with. Older
+        rows are re-rendered when they are read.
+        """
+    )
+    random_key = models.FloatField(
+        default=random.random,
+        editable=False,
+        db_index=True,
+        help_text="""
+        A uniformly random number used to pick random content
+        with a single indexed query.
+        """
+    )
     objects = ContentManager()
 
+    tracked_fields = ('title', 'slug', 'content', 'active', 'author_id', 'author_email')
+    max_slug_attempts = 5
+    search_fields = {'title': 3, 'content': 1}
+
+    def __init__(self, *args, **kwargs):
+        super(Content, self).__init__(*args, **kwargs)
+        self._track_fields()
+
     def __unicode__(self):
         return self.title
 
+    def _track_fields(self):
+        # Read straight from __dict__ so deferred fields aren't loaded.
+        self._tracked_values = dict(
+            (name, self.__dict__.get(name)) for name in self.tracked_fields
+        )
+
+    def has_changed(self, name):
+        """Whether ``name`` differs from the value it was loaded or saved with."""
+        return self._tracked_values.get(name) != self.__dict__.get(name)
+
     def save(self, *args, **kwargs):
-        self.slug = short_slugify(self.title)
-        super(Content, self).save(*args, **kwargs)
+        self.saved([self.write(*args, **kwargs)])
+
+    def write(self, *args, **kwargs):
+        """
+        Saves the row without the side effects of saving, so many rows
+        can be written in one transaction. Returns the change record
+        ``saved`` runs those side effects from.
+        """
+        change = {
+            'obj': self,
+            'adding': self.pk is None,
+            'active_changed': self.pk is not None and self.has_changed('active'),
+            'old_slug': self._tracked_values.get('slug'),
+        }
+        if self.has_changed('author_id') or (self.author_id and not self.author_email):
+            self.author_email = self.author.email if self.author_id else ''
+        if not self.slug or self.slug_is_stale():
+            self.slug = self.reserve_slugs([self.base_slug()])[0]
+        if 'content' in self.__dict__ and (
+            self.has_changed('content') or self.html_is_stale()
+        ):
+            self.render_html()
+        for attempt in range(self.max_slug_attempts):
+            try:
+                super(Content, self).save(*args, **kwargs)
+                break
+            except IntegrityError:
+                # Slugs taken before reservations existed, or clashing
+                # with a truncated and suffixed slug of another title.
+                if attempt == self.max_slug_attempts - 1:
+                    raise
+                self.slug = self.reserve_slugs([self.base_slug()])[0]
+        self._track_fields()
+        return change
+
+    @classmethod
+    def saved(cls, changes):
+        """
+        Invalidates the pages of the saved objects themselves, which is
+        cheap and keeps the author from seeing a stale page, and defers
+        the rest of the side effects of saving them to one task.
+        """
+        tags = [cls.list_cache_tag()]
+        for change in changes:
+            obj = change['obj']
+            tags += [cls.slug_cache_tag(obj.slug), cls.pk_cache_tag(obj.pk)]
+            if change['old_slug'] and change['old_slug'] != obj.slug:
+                tags.append(cls.slug_cache_tag(change['old_slug']))
+                tasks.defer(
+                    tasks.merge_counters,
+                    cls.view_counter_name(change['old_slug']),
+                    cls.view_counter_name(obj.slug)
+                )
+        invalidate_tags(tags)
+        cls.defer_processing([change['obj'].pk for change in changes])
+
+    @classmethod
+    def defer_processing(cls, pks):
+        tasks.defer(
+            tasks.process_saved, cls._meta.app_label, cls._meta.model_name, pks
+        )
+
+    @classmethod
+    def process_saved(cls, pks):
+        """
+        The deferred side effects of saving the ``pks`` rows.
+
+        Works from the rows as they are when it runs rather than from
+        what changed, so running it again, late or concurrently with a
+        newer save is harmless, and the task queue can retry it. Side
+        effects that can't be recomputed that way, like counters kept
+        with deltas, need tasks that record what they applied.
+        """
+        found = cls._default_manager.in_bulk(pks)
+        cls.sync_saved(
+            list(found.values()), [pk for pk in pks if pk not in found]
+        )
+
+    @classmethod
+    def sync_saved(cls, objs, missing):
+        """
+        Brings the search index and cached pages in line with ``objs``.
+        ``missing`` are the pks of rows deleted since they were saved.
+        """
+        for obj in objs:
+            obj.update_search_index()
+        backend = search.get_backend()
+        for pk in missing:
+            backend.remove(cls.search_index_name(), pk)
+        if objs:
+            invalidate_tags(cls.get_bulk_cache_tags(objs))
+
+    @classmethod
+    def save_many(cls, objs):
+        """
+        Saves ``objs`` in cross-group transactions of XG_BATCH_SIZE rows,
+        each committing its puts together, then runs the side effects of
+        saving them in bulk.
+
+        Slugs are reserved up front, as every reservation is an entity
+        group of its own.
+        """
+        for obj in objs:
+            if obj.pk is not None and obj.slug_is_stale():
+                obj.slug = None
+        cls.assign_slugs(objs)
+        changes = []
+        for start in range(0, len(objs), XG_BATCH_SIZE):
+            with transaction.atomic(xg=True):
+                batch = [obj.write() for obj in objs[start:start + XG_BATCH_SIZE]]
+            changes += batch
+        if changes:
+            cls.saved(changes)
+
+    def render_html(self):
+        """Renders ``content`` with the current renderer and cuts its excerpt."""
+        self.excerpt = Truncator(self.content).words(EXCERPT_WORDS)
+        self.content_html = render_text(self.content)
+        self.content_html_version = RENDERER_VERSION
+
+    def html_is_stale(self):
+        return self.__dict__.get('content_html_version') != RENDERER_VERSION
+
+    def rendered_content(self):
+        """
+        The stored HTML of ``content``, rendered again in memory when it
+        was stored by an older renderer. ``rerender_content`` updates
+        the stored copies.
+        """
+        if self.html_is_stale():
+            return mark_safe(render_text(self.content))
+        return mark_safe(self.content_html)
+
+    def rendered_excerpt(self):
+        """The excerpt shown on list pages, short enough to render when read."""
+        return mark_safe(render_text(self.excerpt))
+
+    def base_slug(self):
+        slug = short_slugify(self.title)[:MAX_SLUG_LENGTH].strip('-')
+        return slug or self._meta.model_name
+
+    def slug_is_stale(self):
+        """
+        Whether a title edit changed the base slug, so a new slug should
+        be reserved. Edits that keep the base, like fixing punctuation or
+        a short word, keep the slug and its reservation.
+        """
+        return (
+            self.has_changed('title') and not self.has_changed('slug') and
+            not SlugReservation.is_suffixed(self.slug or '', self.base_slug())
+        )
+
+    @classmethod
+    def reserve_slugs(cls, bases):
+        """
+        Returns a unique slug for each of ``bases``, using one reservation
+        transaction per distinct base, so bulk imports stay cheap.
+        """
+        counts = {}
+        for base in bases:
+            counts[base] = counts.get(base, 0) + 1
+        reserved = dict(
+            (base, SlugReservation.reserve(cls._meta.db_table, base, count))
+            for base, count in counts.items()
+        )
+        return [reserved[base].pop(0) for base in bases]
+
+    @classmethod
+    def assign_slugs(cls, objs):
+        """Gives every unsaved object in ``objs`` a unique slug."""
+        objs = [obj for obj in objs if not obj.slug]
+        slugs = cls.reserve_slugs([obj.base_slug() for obj in objs])
+        for obj, slug in zip(objs, slugs):
+            obj.slug = slug
+
+    @classmethod
+    def set_active_many(cls, objs, active):
+        """
+        Hides or reveals ``objs`` with batched writes of just ``active``
+        and ``modified``, then runs the side effects of saving them in
+        bulk. Returns the objects that actually changed.
+        """
+        changed = [obj for obj in objs if obj.active != active]
+        if not changed:
+            return []
+        modified = timezone.now()
+        batch_update(
+            cls,
+            [obj.pk for obj in changed],
+            active=active,
+            modified=modified
+        )
+        for obj in changed:
+            obj.active = active
+            obj.modified = modified
+            obj._track_fields()
+        cls.saved([
+            {'obj': obj, 'adding': False, 'active_changed': True, 'old_slug': obj.slug}
+            for obj in changed
+        ])
+        return changed
+
+    @classmethod
+    def attach_authors(cls, objs):
+        """Fetches the authors of ``objs`` in one batched get and caches them on each."""
+        field = cls._meta.get_field('author')
+        ids = set(obj.author_id for obj in objs if obj.author_id)
+        authors = field.rel.to._default_manager.in_bulk(list(ids)) if ids else {}
+        for obj in objs:
+            if obj.author_id:
+                setattr(obj, field.get_cache_name(), authors.get(obj.author_id))
+
+    @classmethod
+    def view_counter_name(cls, slug):
+        """Views are counted by slug, so cached pages can count them without a lookup."""
+        return u"{0}:{1}:views".format(cls._meta.db_table, slug)
+
+    @classmethod
+    def record_view(cls, slug):
+        CounterShard.increment(cls.view_counter_name(slug))
+
+    @classmethod
+    def get_bulk_cache_tags(cls, objs):
+        return [cls.list_cache_tag()] + [
+            tag for obj in objs
+            for tag in (cls.slug_cache_tag(obj.slug), cls.pk_cache_tag(obj.pk))
+        ]
+
+    def delete(self, *args, **kwargs):
+        type(self).delete_many([self])
+
+    @classmethod
+    def delete_many(cls, objs):
+        """
+        Deletes ``objs`` MAX_SUBQUERIES at a time, as collecting what
+        cascades from them filters on all of their ids at once, then
+        runs the side effects of deleting them in bulk.
+        """
+        if not objs:
+            return
+        tags = cls.get_bulk_cache_tags(objs)
+        pks = [obj.pk for obj in objs]
+        for start in range(0, len(pks), MAX_SUBQUERIES):
+            cls._default_manager.filter(pk__in=pks[start:start + MAX_SUBQUERIES]).delete()
+        invalidate_tags(tags)
+        backend = search.get_backend()
+        for pk in pks:
+            backend.remove(cls.search_index_name(), pk)
+
+    @classmethod
+    def search_index_name(cls):
+        return cls._meta.db_table
+
+    @classmethod
+    def search_ids(cls, query, filters=None, limit=20):
+        """Returns the pks of the best matches for ``query``, best first."""
+        ids = search.get_backend().search(
+            cls.search_index_name(), query, filters, limit
+        )
+        return [cls._meta.pk.to_python(pk) for pk in ids]
+
+    def get_search_filters(self):
+        return {'active': self.active, 'author': self.author_email}
+
+    def update_search_index(self):
+        search.get_backend().index(
+            self.search_index_name(),
+            self.pk,
+            dict(
+                (name, (getattr(self, name), weight))
+                for name, weight in self.search_fields.items()
+            ),
+            self.get_search_filters()
+        )
+
+    @classmethod
+    def list_cache_tag(cls):
+        return "{0}:list".format(cls._meta.db_table)
+
+    @classmethod
+    def slug_cache_tag(cls, slug):
+        return "{0}:{1}".format(cls._meta.db_table, slug)
+
+    @classmethod
+    def pk_cache_tag(cls, pk):
+        """Tags responses looked up by pk, like the API's, which have no slug."""
+        return "{0}:pk:{1}".format(cls._meta.db_table, pk)
 
     class Meta(TimeStampedModel.Meta):
         abstract = True
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import datetime
+
+from django.utils import timezone
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage(object):
+    """
+    A single page of results from a CursorPaginator.
+
+    Mirrors the parts of django.core.paginator.Page used by list views
+    and templates, with opaque cursors in place of page numbers.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_url = None
+        self.previous_url = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator(object):
+    """
+    Pages through a queryset ordered by ``(-created, -pk)``.
+
+    Each page is fetched with a ``created`` range filter starting at the
+    cursor, so deep pages cost the same as the first one. Posts sharing
+    the cursor's timestamp are picked up by a second, key-ordered query
+    so ties are never skipped or repeated.
+    """
+
+    ordering_field = 'created'
+    epoch = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        if not cursor:
+            return self._page_after(None)
+        direction, created, pk = self.decode_cursor(cursor)
+        if direction == 'n':
+            return self._page_after((created, pk))
+        return self._page_before((created, pk))
+
+    def _page_after(self, position):
+        field = self.ordering_field
+        limit = self.per_page + 1
+        qs = self.queryset
+        if position is None:
+            items = list(qs.order_by('-' + field, '-pk')[:limit])
+        else:
+            created, pk = position
+            items = list(
+                qs.filter(**{field: created, 'pk__lt': pk}).order_by('-pk')[:limit]
+            )
+            if len(items) < limit:
+                items += list(
+                    qs.filter(**{field + '__lt': created})
+                    .order_by('-' + field, '-pk')[:limit - len(items)]
+                )
+        has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        return CursorPage(
+            items,
+            self,
+            next_cursor=self.encode_cursor('n', items[-1]) if has_next else None,
+            previous_cursor=(
+                self.encode_cursor('p', items[0]) if position and items else None
+            ),
+        )
+
+    def _page_before(self, position):
+        field = self.ordering_field
+        limit = self.per_page + 1
+        qs = self.queryset
+        created, pk = position
+        items = list(
+            qs.filter(**{field: created, 'pk__gt': pk}).order_by('pk')[:limit]
+        )
+        if len(items) < limit:
+            items += list(
+                qs.filter(**{field + '__gt': created})
+                .order_by(field, 'pk')[:limit - len(items)]
+            )
+        has_previous = len(items) > self.per_page
+        items = list(reversed(items[:self.per_page]))
+        return CursorPage(
+            items,
+            self,
+            next_cursor=self.encode_cursor('n', items[-1]) if items else None,
+            previous_cursor=(
+                self.encode_cursor('p', items[0]) if has_previous else None
+            ),
+        )
+
+    def encode_cursor(self, direction, obj):
+        value = getattr(obj, self.ordering_field)
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.utc)
+        delta = value - self.epoch
+        micros = (delta.days * 86400 + delta.seconds) * 10 ** 6 + delta.microseconds
+        raw = "{0}|{1}|{2}".format(direction, micros, obj.pk)
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = str(cursor) + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded).decode('ascii')
+            direction, micros, pk = raw.split('|')
+            micros, pk = int(micros), int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise InvalidCursor(cursor)
+        if direction not in ('n', 'p'):
+            raise InvalidCursor(cursor)
+        created = self.epoch + datetime.timedelta(microseconds=micros)
+        return direction, created, pk
+
+
+def cursor_url(request, cursor, param='cursor'):
+    """Returns the current URL with ``param`` set to ``cursor``."""
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[param] = cursor
+    return "{0}?{1}".format(request.path, query.urlencode())
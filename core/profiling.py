@@ -0,0 +1,115 @@
+import threading
+import time
+
+_local = threading.local()
+_hooked_proxy = None
+
+
+class RequestProfile(object):
+    """
+    Costs recorded while handling one request: wall time, datastore
+    RPCs and the entities they read and wrote, memcache hits and misses
+    and the time spent rendering templates.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.started = time.time()
+        self.finished = None
+        self.datastore_rpcs = 0
+        self.entities_read = 0
+        self.entities_written = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.render_time = 0.0
+
+    @property
+    def wall_time(self):
+        return (self.finished or time.time()) - self.started
+
+    def as_dict(self):
+        return {
+            "view": self.name,
+            "wall_ms": int(self.wall_time * 1000),
+            "render_ms": int(self.render_time * 1000),
+            "datastore_rpcs": self.datastore_rpcs,
+            "entities_read": self.entities_read,
+            "entities_written": self.entities_written,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+def _profiles():
+    if not hasattr(_local, "profiles"):
+        _local.profiles = []
+    return _local.profiles
+
+
+def start(name=None):
+    """
+    Starts recording into a new profile for the current thread.
+
+    Profiles nest, e.g. a benchmark around the middleware's, and RPCs
+    count towards every profile that is recording.
+    """
+    install_hooks()
+    profile = RequestProfile(name)
+    _profiles().append(profile)
+    return profile
+
+
+def current():
+    """Returns the innermost profile recording on this thread, if any."""
+    profiles = _profiles()
+    return profiles[-1] if profiles else None
+
+
+def finish():
+    """Stops recording and returns the innermost profile, if any."""
+    profiles = _profiles()
+    if not profiles:
+        return None
+    profile = profiles.pop()
+    profile.finished = time.time()
+    return profile
+
+
+def _record_rpc(service, call, request, response):
+    for profile in _profiles():
+        _record(profile, service, call, request, response)
+
+
+def _record(profile, service, call, request, response):
+    if service == "datastore_v3":
+        profile.datastore_rpcs += 1
+        if call == "Get":
+            profile.entities_read += sum(
+                1 for result in response.entity_list() if result.has_entity()
+            )
+        elif call in ("RunQuery", "Next"):
+            profile.entities_read += response.result_size()
+        elif call == "Put":
+            profile.entities_written += request.entity_size()
+        elif call == "Delete":
+            profile.entities_written += request.key_size()
+    elif service == "memcache" and call == "Get":
+        hits = response.item_size()
+        profile.cache_hits += hits
+        profile.cache_misses += request.key_size() - hits
+
+
+def install_hooks():
+    """
+    Counts every datastore and memcache RPC made while a profile is
+    recording. Installed once per API proxy, which a testbed replaces;
+    costs a thread-local lookup per RPC when nothing is recording.
+    """
+    global _hooked_proxy
+    from google.appengine.api import apiproxy_stub_map
+    if apiproxy_stub_map.apiproxy is _hooked_proxy:
+        return
+    apiproxy_stub_map.apiproxy.GetPostCallHooks().Append(
+        "core.profiling", _record_rpc
+    )
+    _hooked_proxy = apiproxy_stub_map.apiproxy
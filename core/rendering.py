@@ -0,0 +1,6 @@
+from django.template.defaultfilters import linebreaks_filter
+
+
+def render_text(text):
+    """Renders user text as escaped HTML paragraphs, like ``|linebreaks``."""
+    return linebreaks_filter(text or u'', autoescape=True)
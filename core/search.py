@@ -0,0 +1,177 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .constants import REMOVE_LIST
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOP_WORDS = frozenset(REMOVE_LIST)
+
+
+def tokenize(text):
+    """Splits text into lowercase search terms, dropping short stop words."""
+    return [
+        term for term in TOKEN_RE.findall((text or u'').lower())
+        if term not in STOP_WORDS
+    ]
+
+
+class BaseSearchBackend(object):
+    """
+    Interface shared by the search backends.
+
+    Documents are made of weighted text ``fields`` that are tokenized and
+    ranked, and exact-match ``filters`` (e.g. ``active``) that restrict a
+    query without affecting its ranking.
+    """
+
+    def index(self, index_name, doc_id, fields, filters):
+        raise NotImplementedError
+
+    def remove(self, index_name, doc_id):
+        raise NotImplementedError
+
+    def search(self, index_name, query, filters=None, limit=20):
+        """Returns the ids of the best matching documents, best first."""
+        raise NotImplementedError
+
+
+class LocalSearchBackend(BaseSearchBackend):
+    """
+    An in-process inverted index for development and tests.
+
+    Documents must contain every query term and are ranked by TF-IDF,
+    with each field's term frequencies scaled by its weight.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # index -> term -> doc_id -> weighted term frequency
+        self._postings = defaultdict(lambda: defaultdict(dict))
+        # index -> doc_id -> (terms, filters)
+        self._documents = defaultdict(dict)
+
+    def index(self, index_name, doc_id, fields, filters):
+        frequencies = defaultdict(float)
+        for text, weight in fields.values():
+            for term in tokenize(text):
+                frequencies[term] += weight
+        with self._lock:
+            self._remove(index_name, doc_id)
+            for term, frequency in frequencies.items():
+                self._postings[index_name][term][doc_id] = frequency
+            self._documents[index_name][doc_id] = (
+                set(frequencies), dict(filters)
+            )
+
+    def remove(self, index_name, doc_id):
+        with self._lock:
+            self._remove(index_name, doc_id)
+
+    def _remove(self, index_name, doc_id):
+        terms, _ = self._documents[index_name].pop(doc_id, (set(), {}))
+        postings = self._postings[index_name]
+        for term in terms:
+            postings[term].pop(doc_id, None)
+            if not postings[term]:
+                del postings[term]
+
+    def search(self, index_name, query, filters=None, limit=20):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        filters = filters or {}
+        with self._lock:
+            documents = self._documents[index_name]
+            postings = self._postings[index_name]
+            matches = [postings.get(term, {}) for term in terms]
+            candidates = set.intersection(*[set(docs) for docs in matches])
+            scores = {}
+            for doc_id in candidates:
+                doc_filters = documents[doc_id][1]
+                if any(doc_filters.get(k) != v for k, v in filters.items()):
+                    continue
+                scores[doc_id] = sum(
+                    docs[doc_id] * math.log(1.0 + len(documents) / float(len(docs)))
+                    for docs in matches
+                )
+        ranked = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+        return ranked[:limit]
+
+
+class AppEngineSearchBackend(BaseSearchBackend):
+    """
+    Backend storing documents in the App Engine Search API.
+
+    Matches are ranked with the service's TF-IDF scorer. It has no field
+    weights, so a field's text is repeated ``weight`` times instead.
+    """
+
+    def _index(self, index_name):
+        from google.appengine.api import search
+        return search.Index(name=index_name)
+
+    def index(self, index_name, doc_id, fields, filters):
+        from google.appengine.api import search
+        document = search.Document(
+            doc_id=str(doc_id),
+            fields=[
+                search.TextField(
+                    name=name,
+                    value=u" ".join([text or u""] * int(max(1, round(weight))))
+                )
+                for name, (text, weight) in fields.items()
+            ] + [
+                search.AtomField(name=name, value=self._atom(value))
+                for name, value in filters.items()
+            ]
+        )
+        self._index(index_name).put(document)
+
+    def remove(self, index_name, doc_id):
+        self._index(index_name).delete(str(doc_id))
+
+    def search(self, index_name, query, filters=None, limit=20):
+        from google.appengine.api import search
+        terms = tokenize(query)
+        if not terms:
+            return []
+        query_string = u" ".join(
+            [u'"{0}"'.format(term) for term in terms] +
+            [
+                u'{0}:"{1}"'.format(name, self._atom(value))
+                for name, value in (filters or {}).items()
+            ]
+        )
+        options = search.QueryOptions(
+            limit=limit,
+            ids_only=True,
+            sort_options=search.SortOptions(match_scorer=search.MatchScorer()),
+        )
+        results = self._index(index_name).search(
+            search.Query(query_string=query_string, options=options)
+        )
+        return [document.doc_id for document in results]
+
+    def _atom(self, value):
+        if isinstance(value, bool):
+            return u"1" if value else u"0"
+        return u"{0}".format(value)
+
+
+_backend = None
+
+
+def get_backend():
+    """Returns the backend named by the SEARCH_BACKEND setting."""
+    global _backend
+    if _backend is None:
+        _backend = import_string(
+            getattr(settings, "SEARCH_BACKEND", "core.search.AppEngineSearchBackend")
+        )()
+    return _backend
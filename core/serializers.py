@@ -0,0 +1,23 @@
+class DynamicFieldsMixin(object):
+    """
+    Serializer mixin trimming the output to the ``fields`` it is given,
+    and adding the relations named in ``expand``, e.g. from the
+    ``?fields=`` and ``?expand=`` parameters of a request.
+
+    Expandable relations come from ``get_expanded_fields()``; they are
+    left out or shown as bare ids unless expanded.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.requested_fields = kwargs.pop("fields", None)
+        self.expand = frozenset(kwargs.pop("expand", None) or ())
+        super(DynamicFieldsMixin, self).__init__(*args, **kwargs)
+        for name, field in self.get_expanded_fields().items():
+            if name in self.expand:
+                self.fields[name] = field
+        if self.requested_fields is not None:
+            for name in set(self.fields) - set(self.requested_fields):
+                self.fields.pop(name)
+
+    def get_expanded_fields(self):
+        return {}
@@ -5,6 +5,7 @@ from django.conf import settings
 from django.shortcuts import render_to_response
 from django.template import TemplateDoesNotExist, RequestContext
 from django.http import Http404
+from django.utils.text import slugify
 
 from .constants import REMOVE_LIST
 
@@ -106,14 +107,15 @@ def explode(var, sep='', maxsplit=None):
     return -1
 
 
+SHORT_WORDS_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(word) for word in REMOVE_LIST) + r')\b',
+    re.UNICODE
+)
+
+
 def short_slugify(inStr):
     """Slugify a title removing short words."""
-    aslug = inStr.lower()
-    for a in REMOVE_LIST:
-        aslug = re.sub(r'\b'+a+r'\b', ' ', aslug)
-    aslug = re.sub('[^\w\s-]', '', aslug).strip().lower()
-    aslug = re.sub('\s+', '-', aslug)
-    return aslug
+    return slugify(SHORT_WORDS_RE.sub(' ', inStr.lower()))
 
 
 def key_from_value(dict_to_use, val):
@@ -0,0 +1,68 @@
+from django.apps import apps
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class DeferredRunner(object):
+    """
+    Runs tasks on the App Engine task queue with the deferred library,
+    which retries failing tasks with backoff, so tasks must be safe to
+    run more than once.
+    """
+
+    def defer(self, func, *args, **kwargs):
+        from google.appengine.ext import deferred
+        deferred.defer(func, *args, **kwargs)
+
+
+class SyncRunner(object):
+    """
+    Runs tasks in-process as soon as they are deferred, for development
+    and tests. Options for the queue (``_countdown``, ``_queue``...)
+    are ignored and failures are raised to the caller.
+    """
+
+    def defer(self, func, *args, **kwargs):
+        kwargs = dict(
+            (name, value) for name, value in kwargs.items()
+            if not name.startswith('_')
+        )
+        func(*args, **kwargs)
+
+
+_runner = None
+
+
+def get_runner():
+    """Returns the runner named by the TASK_RUNNER setting."""
+    global _runner
+    if _runner is None:
+        _runner = import_string(
+            getattr(settings, "TASK_RUNNER", "core.tasks.DeferredRunner")
+        )()
+    return _runner
+
+
+def defer(func, *args, **kwargs):
+    """Runs ``func(*args, **kwargs)`` later, with the configured runner."""
+    get_runner().defer(func, *args, **kwargs)
+
+
+def process_saved(app_label, model_name, pks):
+    """Runs the deferred side effects of saving the ``pks`` rows of a Content model."""
+    apps.get_model(app_label, model_name).process_saved(pks)
+
+
+def apply_counter_deltas(app_label, model_name, deltas, change_id):
+    """Applies the reply counter deltas of a saved or deleted batch of posts."""
+    apps.get_model(app_label, model_name).apply_counter_deltas(deltas, change_id)
+
+
+def flush_counter(name):
+    """Moves the buffered increments of a counter into its shards."""
+    apps.get_model('core', 'CounterShard').flush(name)
+
+
+def merge_counters(source, target):
+    """Adds the count of a renamed counter to its new name."""
+    apps.get_model('core', 'CounterShard').merge(source, target)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+from django.test import SimpleTestCase
+from django.utils.text import slugify
+
+from . import benchmarks
+from .constants import MAX_SLUG_LENGTH
+from .models import SlugReservation
+from .search import LocalSearchBackend, tokenize
+from .shortcuts import short_slugify
+
+
+class LocalSearchBackendTest(SimpleTestCase):
+
+    def setUp(self):
+        self.backend = LocalSearchBackend()
+        self.index("posts", 1, u"Brewing coffee", u"A guide to pour over.", True)
+        self.index("posts", 2, u"Tea", u"Better than coffee, some say.", True)
+        self.index("posts", 3, u"Hidden coffee", u"Not for everyone.", False)
+
+    def index(self, index_name, doc_id, title, content, active):
+        self.backend.index(
+            index_name,
+            doc_id,
+            {'title': (title, 3), 'content': (content, 1)},
+            {'active': active}
+        )
+
+    def test_tokenize_drops_stop_words(self):
+        self.assertEqual(tokenize(u"The Art of Coffee"), [u"art", u"coffee"])
+
+    def test_title_matches_rank_above_content_matches(self):
+        self.assertEqual(
+            self.backend.search("posts", "coffee", {'active': True}), [1, 2]
+        )
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.backend.search("posts", "coffee guide"), [1])
+        self.assertEqual(self.backend.search("posts", "coffee sugar"), [])
+        self.assertEqual(self.backend.search("posts", "the"), [])
+
+    def test_filters_and_limit(self):
+        self.assertEqual(
+            self.backend.search("posts", "coffee", {'active': False}), [3]
+        )
+        self.assertEqual(len(self.backend.search("posts", "coffee", limit=2)), 2)
+
+    def test_reindexing_replaces_the_document(self):
+        self.index("posts", 2, u"Tea", u"Only tea here.", True)
+        self.assertEqual(
+            self.backend.search("posts", "coffee", {'active': True}), [1]
+        )
+        self.assertEqual(self.backend.search("posts", "only"), [2])
+
+    def test_remove(self):
+        self.backend.remove("posts", 1)
+        self.backend.remove("posts", 42)
+        self.assertEqual(
+            self.backend.search("posts", "coffee", {'active': True}), [2]
+        )
+        self.assertEqual(self.backend.search("posts", "guide"), [])
+
+    def test_indexes_are_separate(self):
+        self.index("pages", 1, u"About", u"Nothing about coffee.", True)
+        self.assertEqual(self.backend.search("pages", "coffee"), [1])
+        self.assertEqual(self.backend.search("pages", "tea"), [])
+
+
+class SlugTest(SimpleTestCase):
+
+    def test_matches_slugify_without_short_words(self):
+        for title in (
+            u"Café Crème", u"Ünïcödé Títle", u"Straße", u"Ïa naïve résumé",
+            u"  Spaces   and -- dashes  ", u"Punctuation! Isn't it?",
+        ):
+            self.assertEqual(short_slugify(title), slugify(title))
+
+    def test_removes_short_words(self):
+        self.assertEqual(short_slugify(u"The Art of Café"), u"art-cafe")
+        self.assertEqual(short_slugify(u"Into the Wild"), u"wild")
+        self.assertEqual(short_slugify(u"The of a"), u"")
+
+    def test_suffixed(self):
+        self.assertEqual(SlugReservation.suffixed(u"title", 0), u"title")
+        self.assertEqual(SlugReservation.suffixed(u"title", 1), u"title-2")
+        self.assertEqual(SlugReservation.suffixed(u"title", 9), u"title-10")
+
+    def test_suffixed_stays_within_max_length(self):
+        base = u"x" * MAX_SLUG_LENGTH
+        for number, suffix in ((1, u"-2"), (9, u"-10"), (99, u"-100")):
+            slug = SlugReservation.suffixed(base, number)
+            self.assertEqual(len(slug), MAX_SLUG_LENGTH)
+            self.assertTrue(slug.endswith(suffix))
+
+    def test_is_suffixed(self):
+        for slug, base, expected in (
+            (u"title", u"title", True),
+            (u"title-2", u"title", True),
+            (u"title-10", u"title", True),
+            (u"title-1", u"title", False),
+            (u"title-2", u"other", False),
+            (u"titles", u"title", False),
+            (u"title-x", u"title", False),
+            (SlugReservation.suffixed(u"x" * MAX_SLUG_LENGTH, 5), u"x" * MAX_SLUG_LENGTH, True),
+        ):
+            self.assertEqual(SlugReservation.is_suffixed(slug, base), expected, slug)
+
+    def test_suffixed_drops_a_dash_left_by_truncation(self):
+        base = u"x" * (MAX_SLUG_LENGTH - 3) + u"-yy"
+        self.assertEqual(
+            SlugReservation.suffixed(base, 1), u"x" * (MAX_SLUG_LENGTH - 3) + u"-2"
+        )
+
+
+class BenchmarksTest(SimpleTestCase):
+
+    def test_percentile(self):
+        for values, fraction, expected in (
+            ([], 0.5, None),
+            ([7], 0.0, 7),
+            ([7], 0.99, 7),
+            ([4, 1, 3, 2], 0.0, 1),
+            ([4, 1, 3, 2], 0.5, 2.5),
+            ([4, 1, 3, 2], 1.0, 4),
+            ([0, 10], 0.9, 9.0),
+        ):
+            self.assertEqual(benchmarks.percentile(values, fraction), expected)
+
+    def test_summarize(self):
+        self.assertEqual(benchmarks.summarize([]), {"count": 0})
+        summary = benchmarks.summarize([0.002])
+        self.assertEqual(summary["count"], 1)
+        self.assertEqual(summary["p50_ms"], 2.0)
+        self.assertEqual(summary["p99_ms"], 2.0)
+
+    def result(self, p90_ms, rpcs):
+        latency = {"count": 0} if p90_ms is None else {"count": 1, "p90_ms": p90_ms}
+        return {"latency": latency, "datastore_rpcs": rpcs}
+
+    def test_compare(self):
+        baseline = {"home": self.result(10.0, 4)}
+        for results, regressions in (
+            ({}, 0),
+            ({"new": self.result(99.0, 99)}, 0),
+            ({"home": self.result(10.0, 4)}, 0),
+            ({"home": self.result(12.5, 4)}, 0),
+            ({"home": self.result(12.6, 4)}, 1),
+            ({"home": self.result(8.0, 3)}, 0),
+            ({"home": self.result(10.0, 5)}, 1),
+            ({"home": self.result(20.0, 5)}, 2),
+            ({"home": self.result(None, 4)}, 0),
+        ):
+            self.assertEqual(
+                len(benchmarks.compare(results, baseline, 0.25)), regressions,
+                results
+            )
@@ -1,14 +1,20 @@
 import json
 import operator
+import random
+from calendar import timegm
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.template.response import SimpleTemplateResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
 from django.conf import settings
 from django.contrib import messages
 from django.db.models import Q
-from django.db import NotSupportedError
+from django.core.cache import cache
 
 from .shortcuts import not_implemented, is_array
+from .pagination import CursorPaginator, InvalidCursor, cursor_url
+from .cache import tagged_key
 
 
 class NotFoundMixin(object):
@@ -22,6 +28,25 @@ class NotFoundMixin(object):
         return obj
 
 
+class LazyContextVariable(object):
+    """
+    Resolves a view attribute the first time a template reads it.
+
+    Templates call callables they find in the context, so wrapping a
+    property in this defers its work until it is actually rendered and
+    memoizes the result for the rest of the request.
+    """
+
+    def __init__(self, view, name):
+        self.view = view
+        self.name = name
+
+    def __call__(self):
+        if not hasattr(self, "value"):
+            self.value = getattr(self.view, self.name)
+        return self.value
+
+
 class ContextVariableMixin(object):
     """
     Mixin for setting context data using class attributes.
@@ -30,10 +55,26 @@ class ContextVariableMixin(object):
             prefix = "context_"
             context_bar = "foo"
         MyClass().get_context_data()["bar"] => "foo"
+
+    Properties are passed to the template lazily, so the ones a
+    template never reads are never evaluated.
     """
 
     prefix = "context_"
 
+    @classmethod
+    def get_context_variables(cls):
+        """Returns ``(name, is_property)`` pairs, computed once per class."""
+        variables = cls.__dict__.get("_context_variables")
+        if variables is None:
+            variables = tuple(
+                (var, isinstance(getattr(cls, var, None), property))
+                for var in dir(cls)
+                if var.startswith(cls.prefix)
+            )
+            cls._context_variables = variables
+        return variables
+
     def get_context_data(self, **kwargs):
         context = super(
             ContextVariableMixin,
@@ -41,14 +82,161 @@ class ContextVariableMixin(object):
         ).get_context_data(**kwargs)
         context.update(
             {
-                var[len(self.prefix):]: getattr(self, var)
-                for var in dir(self)
-                if var.startswith(self.prefix)
+                var[len(self.prefix):]: (
+                    LazyContextVariable(self, var) if is_property
+                    else getattr(self, var)
+                )
+                for var, is_property in self.get_context_variables()
             }
         )
         return context
 
 
+class CachedPageMixin(object):
+    """
+    Mixin for serving rendered pages to anonymous visitors from the cache.
+
+    Keys are built from ``get_cache_tags()`` and the full path, so saving
+    content (which invalidates its tags) orphans every cached page that
+    showed it. Authenticated pages, staff ones included, carry per-user
+    controls and are always rendered, so one copy serves every visitor.
+    """
+
+    cache_prefix = "page"
+    cache_timeout = 60 * 10
+    cached_headers = ("Content-Type", "Last-Modified")
+
+    def get_cache_tags(self):
+        return []
+
+    def get_cache_key(self):
+        if self.request.method != "GET" or self.request.user.is_authenticated():
+            return None
+        return tagged_key(
+            self.cache_prefix,
+            self.get_cache_tags(),
+            self.request.get_full_path(),
+        )
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_cache_key()
+        if key is None:
+            return super(CachedPageMixin, self).get(request, *args, **kwargs)
+
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for name, value in headers.items():
+                response[name] = value
+            return response
+
+        response = super(CachedPageMixin, self).get(request, *args, **kwargs)
+
+        def store(response):
+            if response.status_code == 200:
+                headers = dict(
+                    (name, response[name]) for name in self.cached_headers
+                    if response.has_header(name)
+                )
+                cache.set(key, (response.content, headers), self.cache_timeout)
+
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(store)
+        return response
+
+
+class ConditionalGetMixin(object):
+    """
+    Mixin answering conditional GETs with 304 Not Modified.
+
+    The ETag is built like a CachedPageMixin key, from the generations
+    of ``get_cache_tags()``, the viewer and the request, so it can be
+    checked before fetching anything and changes whenever content on
+    the page is saved. ``get_last_modified()`` adds a Last-Modified
+    header to rendered responses, and is only consulted up front for
+    clients sending If-Modified-Since without an ETag.
+
+    Goes before CachedPageMixin, so cached pages are revalidated too.
+    """
+
+    etag_prefix = "etag"
+
+    def get_cache_tags(self):
+        return []
+
+    def get_last_modified(self):
+        """Returns when the response last changed, or None when unknown."""
+        return None
+
+    def get_etag(self):
+        user = self.request.user
+        key = tagged_key(
+            self.etag_prefix,
+            self.get_cache_tags(),
+            user.pk if user.is_authenticated() else "anonymous",
+            self.request.get_full_path(),
+            self.request.META.get("HTTP_ACCEPT", ""),
+        )
+        return key.split(":", 1)[1]
+
+    def is_not_modified(self, etag):
+        if_none_match = self.request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match:
+            return etag in parse_etags(if_none_match)
+        since = parse_http_date_safe(
+            self.request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+        )
+        if since is None:
+            return False
+        last_modified = self.get_last_modified()
+        return last_modified is not None and timegm(last_modified.utctimetuple()) <= since
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag()
+        if self.is_not_modified(etag):
+            response = HttpResponseNotModified()
+        else:
+            response = super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = quote_etag(etag)
+        # Fresh responses only: cached pages carry their stored header.
+        if response.status_code == 200 and isinstance(response, SimpleTemplateResponse):
+            last_modified = self.get_last_modified()
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(timegm(last_modified.utctimetuple()))
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+
+class SparseFieldsMixin(object):
+    """
+    Mixin for API views handing ``?fields=`` and ``?expand=``, as comma
+    separated names, to a DynamicFieldsMixin serializer when reading.
+    """
+
+    fields_param = "fields"
+    expand_param = "expand"
+
+    def get_names_param(self, param):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    def get_requested_fields(self):
+        return self.get_names_param(self.fields_param)
+
+    def get_expand(self):
+        return self.get_names_param(self.expand_param) or []
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in ("GET", "HEAD"):
+            kwargs.setdefault("fields", self.get_requested_fields())
+            kwargs.setdefault("expand", self.get_expand())
+        return super(SparseFieldsMixin, self).get_serializer(*args, **kwargs)
+
+
 class TitleContextMixin(object):
 
     def __get_title(self):
@@ -87,22 +275,96 @@ class ActionMixin(object):
         return super(ActionMixin, self).form_valid(form)
 
 
+class CursorPaginationMixin(object):
+    """
+    Mixin for list views that pages with opaque keyset cursors instead
+    of page numbers, so every page costs the same to fetch.
+    """
+
+    paginate_by = 20
+    cursor_kwarg = "cursor"
+
+    def get_paginator(self, queryset, page_size):
+        return CursorPaginator(queryset, page_size)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        page.next_url = cursor_url(
+            self.request, page.next_cursor, self.cursor_kwarg
+        )
+        page.previous_url = cursor_url(
+            self.request, page.previous_cursor, self.cursor_kwarg
+        )
+        return page
+
+
+class SearchMixin(object):
+    """
+    Mixin for list views that answers ``?q=`` from the search index.
+
+    Matches are restricted by ``get_search_filters()`` and loaded with a
+    single batched get, best match first. Search results are a single
+    page of at most ``search_limit`` objects.
+    """
+
+    search_param = "q"
+    search_limit = 50
+
+    def get_search_query(self):
+        return self.request.GET.get(self.search_param, "").strip()
+
+    def get_search_filters(self):
+        return {}
+
+    def get_search_queryset(self):
+        return self.model._default_manager.all()
+
+    def get_search_results(self, query):
+        ids = self.model.search_ids(
+            query, self.get_search_filters(), self.search_limit
+        )
+        found = self.get_search_queryset().in_bulk(ids) if ids else {}
+        return [found[pk] for pk in ids if pk in found]
+
+    def get(self, request, *args, **kwargs):
+        query = self.get_search_query()
+        if not query:
+            return super(SearchMixin, self).get(request, *args, **kwargs)
+        self.object_list = self.get_search_results(query)
+        context = self.get_context_data(
+            page_obj=None,
+            is_paginated=False,
+            paginator=None,
+        )
+        return self.render_to_response(context)
+
+
 class RandomObjectMixin(object):
+    """
+    Picks a random object in constant time using the indexed
+    ``random_field``: the first object at or above a random number,
+    wrapping around to the lowest one when nothing is above it.
+    """
+
+    random_field = "random_key"
 
     def get_object(self, queryset=None):
         if queryset is None:
             queryset = self.get_queryset()
-        try:
-            return queryset.order_by('?')[0]
-        except NotSupportedError:
-            if queryset:
-                import random
-                return random.choice(queryset)
-            else:
-                return queryset.none()
-        except (ObjectDoesNotExist, IndexError):
-            return queryset.none()
-            
+        pick = random.random()
+        for lookup in ("__gte", "__lt"):
+            try:
+                return queryset.filter(
+                    **{self.random_field + lookup: pick}
+                ).order_by(self.random_field)[0]
+            except IndexError:
+                continue
+        return None
+
 
 class ActiveMixin(object):
 
@@ -1,6 +1,12 @@
+import os
 import sys
+import time
+from collections import namedtuple
 from os.path import dirname, abspath, join, exists
 
+# When the instance started loading the app, used to report startup time.
+STARTED_AT = time.time()
+
 PROJECT_DIR = dirname(dirname(abspath(__file__)))
 SITEPACKAGES_DIR = join(PROJECT_DIR, "sitepackages")
 APPENGINE_DIR = join(SITEPACKAGES_DIR, "google_appengine")
@@ -14,23 +20,67 @@ def fix_path():
 
 
 
+AppConfig = namedtuple("AppConfig", ["secret_key"])
+
+SECRET_KEY_ENV = "SECRET_KEY"
+SECRET_KEY_CACHE_KEY = "scaffold:config:secret_key"
+_config_model = None
+
+
+def get_config_model():
+    global _config_model
+    if _config_model is None:
+        from google.appengine.ext import ndb
+
+        class Config(ndb.Model):
+            """A simple key-value store for application configuration settings."""
+            secret_key = ndb.StringProperty()
+
+        _config_model = Config
+    return _config_model
+
+
 def get_app_config():
-    """Returns the application configuration, creating it if necessary."""
-    from django.utils.crypto import get_random_string
+    """
+    Returns the application configuration, creating it if necessary.
+
+    Runs at settings import on every instance start, so the datastore
+    is only the last resort after the environment and memcache.
+    """
+    secret_key = os.environ.get(SECRET_KEY_ENV)
+    if secret_key:
+        return AppConfig(secret_key=secret_key)
+
+    from google.appengine.api import memcache
+    secret_key = memcache.get(SECRET_KEY_CACHE_KEY)
+    if secret_key is None:
+        secret_key = get_or_create_config().secret_key
+        memcache.set(SECRET_KEY_CACHE_KEY, secret_key)
+    return AppConfig(secret_key=secret_key)
+
+
+def get_or_create_config():
+    """
+    Fetches the Config entity, creating it in a transaction so instances
+    booting at the same time all end up with the same secret key.
+    """
     from google.appengine.ext import ndb
 
-    class Config(ndb.Model):
-        """A simple key-value store for application configuration settings."""
-        secret_key = ndb.StringProperty()
+    key = ndb.Key(get_config_model(), 'config')
+    entity = key.get()
+    if entity is None:
+        entity = ndb.transaction(lambda: _create_config(key))
+    return entity
 
-    # Create a random SECRET_KEY hash
-    chars = 'abcdefghijklmnopqrstuvwxyz0123456789!@#$%^&*(-_=+)'
-    secret_key = get_random_string(50, chars)
 
-    key = ndb.Key(Config, 'config')
+def _create_config(key):
     entity = key.get()
-    if not entity:
-        entity = Config(key=key)
-        entity.secret_key = str(secret_key)
+    if entity is None:
+        from django.utils.crypto import get_random_string
+
+        # Create a random SECRET_KEY hash
+        chars = 'abcdefghijklmnopqrstuvwxyz0123456789!@#$%^&*(-_=+)'
+        entity = get_config_model()(key=key)
+        entity.secret_key = str(get_random_string(50, chars))
         entity.put()
     return entity
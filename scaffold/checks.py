@@ -1,5 +1,7 @@
 from django.conf import settings
 
+from core.loaders import bundle_is_current
+
 def check_session_csrf_enabled():
     if "session_csrf.CsrfMiddleware" not in settings.MIDDLEWARE_CLASSES:
         return [ "SESSION_CSRF_DISABLED"]
@@ -26,3 +28,11 @@ def check_csp_sources_not_unsafe():
             messages.append(csp_src_name + "_UNSAFE")
     return messages
 check_csp_sources_not_unsafe.messages = { src + "_UNSAFE": "Please remove 'unsafe-inline'/'unsafe-eval' from " + src for src in CSP_SOURCE_NAMES }
+
+
+
+def check_template_bundle_is_current():
+    if not settings.DEBUG and not bundle_is_current():
+        return ["TEMPLATE_BUNDLE_OUT_OF_DATE"]
+    return []
+check_template_bundle_is_current.messages = { "TEMPLATE_BUNDLE_OUT_OF_DATE" : "Please run 'manage.py bundle_templates' before deploying" }
@@ -18,6 +18,9 @@ TEMPLATE_DIRS = (
     PROJECT_DIR.child("templates"),
 )
 
+# Module written by `manage.py bundle_templates`, served by core.loaders.BundleLoader
+TEMPLATE_BUNDLE = 'scaffold.template_bundle'
+
 STATICFILES_DIRS = (
     PROJECT_DIR.child("static"),
 )
@@ -54,12 +57,14 @@ THIRD_PARTY_APPS = (
 )
 
 LOCAL_APPS = (
+    'core',
     'blog',
 )
 
 INSTALLED_APPS = DEFAULT_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE_CLASSES = (
+    'core.middleware.ProfilingMiddleware',
     'djangae.contrib.security.middleware.AppEngineSecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,6 +75,14 @@ MIDDLEWARE_CLASSES = (
     'djangosecure.middleware.SecurityMiddleware',
 )
 
+# Side effects of saving run on the task queue, see core.tasks.
+TASK_RUNNER = 'core.tasks.DeferredRunner'
+
+# Per-request costs, see core.middleware.ProfilingMiddleware. Shown as
+# response headers under DEBUG, otherwise logged for a sample of requests.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.05
+
 TEMPLATE_CONTEXT_PROCESSORS = (
     "django.contrib.auth.context_processors.auth",
     "django.core.context_processors.debug",
@@ -134,4 +147,6 @@ CSP_CONNECT_SRC = ("'self'", "plus.google.com", "www.google-analytics.com")
 
 AUTOLOAD_SITECONF = 'scaffold.indexes'
 
+SEARCH_BACKEND = 'core.search.AppEngineSearchBackend'
+
 from djangae.contrib.gauth.settings import *
@@ -7,5 +7,17 @@ ALLOWED_HOSTS = ['*']
 
 EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+SEARCH_BACKEND = 'core.search.LocalSearchBackend'
+
+PROFILING_ENABLED = True
+
+TASK_RUNNER = 'core.tasks.SyncRunner'
+
 CSP_STYLE_SRC = ("'self'", "'unsafe-inline'")
 
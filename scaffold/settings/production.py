@@ -15,7 +15,22 @@ SECURE_REDIRECT_EXEMPT = [
     r"^_ah/"
 ]
 
-SECURE_CHECKS += ["scaffold.checks.check_csp_sources_not_unsafe"]
+SECURE_CHECKS += [
+    "scaffold.checks.check_csp_sources_not_unsafe",
+    "scaffold.checks.check_template_bundle_is_current",
+]
 
 DEBUG = False
 TEMPLATE_DEBUG = False
+
+PROFILING_ENABLED = True
+
+# Compile each template once per instance, reading sources from the
+# prebuilt bundle before falling back to the (slow) filesystem.
+TEMPLATE_LOADERS = (
+    ('django.template.loaders.cached.Loader', (
+        'core.loaders.BundleLoader',
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    )),
+)
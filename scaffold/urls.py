@@ -11,6 +11,7 @@ admin.autodiscover()
 urlpatterns = patterns('',
     # Examples:
     url(r'^blog/', include('blog.urls')),
+    url(r'^_ah/warmup$', 'scaffold.views.warmup'),
     url(r'^_ah/', include('djangae.urls')),
 
     # Note that by default this is also locked down with login:admin in app.yaml
@@ -0,0 +1,11 @@
+// Fills in view counts, which cached pages leave out as they change
+// without the post being saved.
+$(function () {
+  $("[data-view-count]").each(function () {
+    var placeholder = $(this);
+    $.getJSON(placeholder.data("view-count"), function (counts) {
+      var views = counts[placeholder.attr("data-slug")] || 0;
+      placeholder.text(views + (views === 1 ? " view" : " views") + " \u00b7 ");
+    });
+  });
+});